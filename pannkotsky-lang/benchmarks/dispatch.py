@@ -0,0 +1,38 @@
+"""
+Dispatch counts of the example programs with and without superinstructions.
+
+Programs reading input get the same values as in the executor benchmark.
+
+Usage: python -m benchmarks.dispatch [iterations]
+"""
+import os
+import sys
+from unittest import mock
+
+from source.bytecode import compile_rpn
+from source.exec import Executor
+
+from .executor import EXAMPLES_DIR, INPUTS, build_rpn
+
+
+def count_dispatches(rpn_tokens, inputs, superinstructions):
+    executor = Executor(compile_rpn(rpn_tokens, superinstructions))
+    with mock.patch('builtins.input', side_effect=inputs):
+        executor.execute()
+    return executor.steps
+
+
+def main(iterations=1000):
+    print(f'{"program":<12} {"before":>10} {"after":>10}')
+    for name in sorted(os.listdir(EXAMPLES_DIR)):
+        if not name.endswith('.pkl'):
+            continue
+        rpn_tokens = build_rpn(os.path.join(EXAMPLES_DIR, name))
+        inputs = INPUTS[name](iterations) if name in INPUTS else []
+        before = count_dispatches(rpn_tokens, inputs, superinstructions=False)
+        after = count_dispatches(rpn_tokens, inputs, superinstructions=True)
+        print(f'{name:<12} {before:>10} {after:>10} {after / before:8.0%}')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
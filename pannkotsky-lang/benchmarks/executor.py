@@ -0,0 +1,60 @@
+"""
+Executor benchmark over the example programs.
+
+Programs reading input get values which make their loops run `iterations` times,
+the rest are executed repeatedly until `iterations` RPN tokens are processed.
+
+Usage: python -m benchmarks.executor [iterations]
+"""
+import os
+import sys
+import time
+from unittest import mock
+
+from source.scan import Scanner
+from source.syntax import SyntaxAnalyzer
+from source.rpn import RPNBuilder
+from source.bytecode import compile_rpn
+from source.exec import Executor
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'examples')
+
+# values entered for 'input' so that the main loop runs N times
+INPUTS = {
+    '1.pkl': lambda n: ['0', str(n)],
+    'example.pkl': lambda n: [str(-n)],
+}
+
+
+def build_rpn(path):
+    with open(path) as f:
+        scan_tokens = Scanner(f).scan()
+    return RPNBuilder(SyntaxAnalyzer(scan_tokens).run()).build()
+
+
+def run_example(name, iterations):
+    rpn_tokens = build_rpn(os.path.join(EXAMPLES_DIR, name))
+    if name in INPUTS:
+        runs = 1
+        inputs = INPUTS[name](iterations)
+    else:
+        runs = max(1, iterations // len(rpn_tokens))
+        inputs = []
+
+    # compile once so that only execution is measured
+    program = compile_rpn(rpn_tokens)
+    start = time.perf_counter()
+    with mock.patch('builtins.input', side_effect=inputs * runs):
+        for _ in range(runs):
+            Executor(program).execute()
+    return time.perf_counter() - start
+
+
+def main(iterations=1000000):
+    for name in sorted(os.listdir(EXAMPLES_DIR)):
+        if name.endswith('.pkl'):
+            print(f'{name:<12} {run_example(name, iterations):8.3f}s')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
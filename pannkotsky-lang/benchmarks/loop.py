@@ -0,0 +1,30 @@
+"""
+Loop iteration microbenchmark: every iteration of 'repeat ... until' takes a jump.
+
+Usage: python -m benchmarks.loop [iterations]
+"""
+import sys
+import time
+
+from source.exec import Executor
+
+
+def loop_rpn(iterations):
+    # var i := 0
+    # repeat
+    # i := i + 1
+    # until i == N
+    return f'i var 0 := i i 1 + := i {iterations} == 4 goto_if_not'.split()
+
+
+def main(iterations=1000000):
+    rpn_tokens = loop_rpn(iterations)
+    start = time.perf_counter()
+    Executor(rpn_tokens).execute()
+    elapsed = time.perf_counter() - start
+    print(f'{iterations} iterations: {elapsed:.3f}s, '
+          f'{elapsed / iterations * 1e9:.0f}ns per iteration')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,40 @@
+"""
+RPNBuilder scaling benchmark over generated programs of if and repeat blocks.
+
+Usage: python -m benchmarks.rpn [max_tokens]
+"""
+import sys
+import time
+
+from source.rpn import RPNBuilder
+
+# if a > b
+# a := a + 1
+#
+# repeat
+# b := b - 1
+#
+# until b < a
+#
+BLOCK = ('if a > b \\n a := a + 1 \\n \\n '
+         'repeat \\n b := b - 1 \\n \\n until b < a \\n \\n').split()
+
+
+def generate_tokens(size):
+    return BLOCK * (size // len(BLOCK))
+
+
+def main(max_tokens=1000000):
+    size = 1000
+    while size <= max_tokens:
+        tokens = generate_tokens(size)
+        start = time.perf_counter()
+        RPNBuilder(tokens).build()
+        elapsed = time.perf_counter() - start
+        print(f'{len(tokens):>8} tokens: {elapsed:8.3f}s, '
+              f'{elapsed / len(tokens) * 1e6:.2f}us per token')
+        size *= 10
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,27 @@
+"""
+Scanner and RegexScanner throughput benchmark over a generated program.
+
+Usage: python -m benchmarks.scan [lines]
+"""
+import sys
+import time
+from io import StringIO
+
+from benchmarks.syntax import generate_program
+from source.lexer import RegexScanner
+from source.scan import Scanner
+
+
+def main(lines=100000):
+    program = generate_program(lines)
+    size = len(program.encode()) / 2 ** 20
+    for scanner_class in [Scanner, RegexScanner]:
+        start = time.perf_counter()
+        scanner_class(StringIO(program)).scan()
+        elapsed = time.perf_counter() - start
+        print(f'{scanner_class.__name__:<12} {size:.2f} MB in {elapsed:.3f}s: '
+              f'{size / elapsed:.2f} MB/s')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
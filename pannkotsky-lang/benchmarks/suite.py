@@ -0,0 +1,211 @@
+"""
+Benchmark suite timing every compiler phase and the executor over generated programs.
+
+Results keep the best time and the peak memory of every phase, they are saved
+as JSON and compared against a baseline by the cli:
+
+    python cli.py benchmark --output baseline.json
+    python cli.py benchmark --output current.json
+    python cli.py benchmark-compare baseline.json current.json
+"""
+import platform
+import random
+import time
+import tracemalloc
+from io import StringIO
+from typing import Dict, List
+
+from source.bytecode import compile_rpn
+from source.exec import Executor
+from source.rpn import RPNBuilder
+from source.scan import Scanner
+from source.syntax import SyntaxAnalyzer
+
+RESULTS_VERSION = 1
+
+# generated programs of the suite by name: compiler phases dominate the first two, executor the last
+SUITE = {
+    'flat': {'statements': 5000, 'depth': 0, 'loop_iterations': 1},
+    'nested': {'statements': 2000, 'depth': 6, 'loop_iterations': 2},
+    'loops': {'statements': 200, 'depth': 3, 'loop_iterations': 100},
+}
+
+VARIABLES = ['a', 'b', 'c', 'd']
+_INDENT = '    '
+
+
+class _ProgramGenerator:
+    """ Writes random statements, loops and 'if' blocks of bounded values. """
+
+    def __init__(self, depth: int, loop_iterations: int, seed: int):
+        self.depth = depth
+        self.loop_iterations = loop_iterations
+        self.random = random.Random(seed)
+        self.lines = []
+
+    def emit(self, level: int, line: str):
+        self.lines.append(_INDENT * level + line if line else '')
+
+    def operand(self) -> str:
+        return self.random.choice(VARIABLES + [str(self.random.randint(1, 9))])
+
+    def expression(self) -> str:
+        # values stay small: sums are halved and products are divided by more than they multiply
+        variable = self.random.choice(VARIABLES)
+        if self.random.random() < 0.25:
+            factor = self.random.randint(2, 5)
+            return f'{variable} * {factor} / {factor + 1}'
+        operator = self.random.choice(['+', '-'])
+        return f'({variable} {operator} {self.operand()}) / 2'
+
+    def condition(self) -> str:
+        operator = self.random.choice(['<', '>', '<=', '>=', '==', '!='])
+        return f'{self.random.choice(VARIABLES)} {operator} {self.operand()}'
+
+    def statement(self, level: int) -> int:
+        """ Writes a statement at nesting level, returns amount of statements written. """
+
+        kind = self.random.random() if level < self.depth else 1
+        if kind < 0.15:
+            return self.loop(level)
+        if kind < 0.3:
+            self.emit(level, f'if {self.condition()}')
+            count = 1 + self.body(level + 1)
+            # empty line ends the block
+            self.emit(level, '')
+            return count
+        if kind < 0.35:
+            self.emit(level, f'print {self.random.choice(VARIABLES)}')
+        else:
+            self.emit(level, f'{self.random.choice(VARIABLES)} := {self.expression()}')
+        return 1
+
+    def loop(self, level: int) -> int:
+        # every nesting level has its own counter, so loops run loop_iterations times
+        counter = f'i{level}'
+        self.emit(level, f'{counter} := 0')
+        self.emit(level, 'repeat')
+        count = 2 + self.body(level + 1)
+        self.emit(level + 1, f'{counter} := {counter} + 1')
+        self.emit(level, f'until {counter} >= {self.loop_iterations}')
+        return count + 1
+
+    def body(self, level: int) -> int:
+        return sum(self.statement(level) for _ in range(self.random.randint(1, 3)))
+
+    def program(self, statements: int) -> str:
+        for variable in VARIABLES:
+            self.emit(0, f'var {variable} := {self.random.randint(1, 9)}')
+        for level in range(self.depth):
+            self.emit(0, f'var i{level} := 0')
+        count = len(self.lines)
+        while count < statements:
+            count += self.statement(0)
+        return '\n'.join(self.lines) + '\n'
+
+
+def generate_program(statements: int = 1000, depth: int = 3, loop_iterations: int = 10,
+                     seed: int = 0) -> str:
+    """
+    Generates program of about given amount of statements, with 'if' blocks and
+    'repeat' loops nested up to depth, every loop running loop_iterations times.
+
+    Programs with the same arguments are the same.
+    """
+
+    return _ProgramGenerator(depth, loop_iterations, seed).program(statements)
+
+
+def _phases(source: str) -> list:
+    # every phase takes the result of the previous one
+    return [
+        ('scan', lambda _: Scanner(StringIO(source)).scan()),
+        ('syntax', lambda tokens: SyntaxAnalyzer(tokens).run()),
+        ('rpn', lambda tokens: RPNBuilder(tokens, record_steps=False).build()),
+        ('compile', compile_rpn),
+        ('execute', lambda program: Executor(program, inputs=[]).execute()),
+    ]
+
+
+def benchmark_program(source: str, repeat: int = 3) -> Dict[str, dict]:
+    """
+    Runs every phase on the program repeat times, returns the best seconds and
+    the peak traced memory in bytes of every phase.
+
+    Memory is measured in a separate run, since tracing slows phases down.
+    """
+
+    results = {}
+    value = None
+    for phase, function in _phases(source):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = function(value)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+
+        tracemalloc.start()
+        try:
+            function(value)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        results[phase] = {'seconds': best, 'peak_memory': peak}
+        value = result
+    return results
+
+
+def run_suite(suite: Dict[str, dict] = SUITE, repeat: int = 3) -> dict:
+    """ Benchmarks every program of the suite, returns results which are saved as JSON. """
+
+    cases = {}
+    for name, params in suite.items():
+        source = generate_program(**params)
+        cases[name] = {
+            'params': params,
+            'lines': source.count('\n'),
+            'phases': benchmark_program(source, repeat),
+        }
+    return {
+        'version': RESULTS_VERSION,
+        'python': platform.python_version(),
+        'cases': cases,
+    }
+
+
+def compare_results(baseline: dict, current: dict, threshold: float = 0.1,
+                    memory_threshold: float = 0.1) -> List[dict]:
+    """
+    Compares phases present in both results.
+
+    Returns a row for every phase with ratios of current to baseline time and memory,
+    phases slower or taking more memory than allowed by thresholds are regressions.
+    """
+
+    if baseline.get('version') != current.get('version'):
+        raise ValueError('Results of different versions can not be compared')
+
+    rows = []
+    for name, case in current['cases'].items():
+        baseline_case = baseline['cases'].get(name)
+        if baseline_case is None or baseline_case['params'] != case['params']:
+            continue
+        for phase, result in case['phases'].items():
+            before = baseline_case['phases'].get(phase)
+            if before is None:
+                continue
+            time_ratio = result['seconds'] / before['seconds'] if before['seconds'] else 1
+            memory_ratio = (result['peak_memory'] / before['peak_memory']
+                            if before['peak_memory'] else 1)
+            rows.append({
+                'case': name,
+                'phase': phase,
+                'seconds': result['seconds'],
+                'time_ratio': time_ratio,
+                'peak_memory': result['peak_memory'],
+                'memory_ratio': memory_ratio,
+                'regression': time_ratio > 1 + threshold or memory_ratio > 1 + memory_threshold,
+            })
+    return rows
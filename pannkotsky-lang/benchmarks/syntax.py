@@ -0,0 +1,40 @@
+"""
+SyntaxAnalyzer scaling benchmark over generated programs.
+
+Usage: python -m benchmarks.syntax [max_lines]
+"""
+import sys
+import time
+from io import StringIO
+
+from source.scan import Scanner
+from source.syntax import SyntaxAnalyzer
+
+HEADER = 'var a := 1\nvar b := 2\n'
+BLOCK = ('if a > b\n'
+         'a := a + 1\n'
+         'print a\n'
+         '\n'
+         'repeat\n'
+         'b := (b - 1) * 2\n'
+         'until b < a\n')
+
+
+def generate_program(lines):
+    return HEADER + BLOCK * (lines // BLOCK.count('\n'))
+
+
+def main(max_lines=50000):
+    lines = 1000
+    while lines <= max_lines:
+        scan_tokens = Scanner(StringIO(generate_program(lines))).scan()
+        start = time.perf_counter()
+        SyntaxAnalyzer(scan_tokens).run()
+        elapsed = time.perf_counter() - start
+        print(f'{lines:>7} lines, {len(scan_tokens):>7} tokens: {elapsed:8.3f}s, '
+              f'{elapsed / len(scan_tokens) * 1e6:.2f}us per token')
+        lines *= 5 if str(lines).startswith('1') else 2
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
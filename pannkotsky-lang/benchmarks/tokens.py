@@ -0,0 +1,34 @@
+"""
+Memory taken by scan tokens of a generated program and by program tokens checked by SyntaxAnalyzer.
+
+Usage: python -m benchmarks.tokens [lines]
+"""
+import gc
+import sys
+import tracemalloc
+
+from benchmarks.syntax import generate_program
+from source.lexer import RegexScanner
+from source.syntax import SyntaxAnalyzer
+
+
+def _measure(name, function, *args):
+    gc.collect()
+    tracemalloc.start()
+    tokens = function(*args)
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'{name}: {len(tokens)} tokens: {size / 2 ** 20:.2f} MB, '
+          f'{size / len(tokens):.1f} bytes per token')
+    return tokens
+
+
+def main(lines=100000):
+    program = generate_program(lines)
+    scan_tokens = _measure('scan', RegexScanner(program).scan)
+    _measure('syntax', SyntaxAnalyzer(scan_tokens).run)
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -1,23 +1,35 @@
 #!/usr/bin/env python3
+import json
+import sys
+
 import click
 from tabulate import tabulate
 
+from benchmarks.suite import SUITE, compare_results, run_suite
 from source.helpers import (get_language_tokens_table, get_scan_output_table,
                             get_program_tokens_table, get_idents_table, get_contants_table,
-                            get_labels_table, get_rpn_table)
+                            get_labels_table, get_rpn_table, get_line_profile_table,
+                            get_opcode_profile_table)
+from source.batch import read_input_vectors, run_batch
+from source.cache import ProgramCache
 from source.errors import PKLanguageError
 from source.scan import Scanner
 from source.syntax import SyntaxAnalyzer
 from source.rpn import RPNBuilder
 from source.exec import Executor
+from source.inputs import StreamInput
+from source.optimize import optimize_rpn
+from source.output import StreamSink
+from source.pipeline import compile_source, run_source, stream_program
+from source.vectorized import run_vectorized
 
 
 def _print_table(table):
     click.echo(tabulate(table['rows'], table['headers'], 'grid'))
 
 
-def _scan(input_file):
-    scanner = Scanner(input_file)
+def _scan(input_file, trace=False):
+    scanner = Scanner(input_file, trace=trace)
 
     try:
         tokens = scanner.scan()
@@ -26,10 +38,12 @@ def _scan(input_file):
         exit(1)
         return
 
-    click.echo("Analysis table")
-    _print_table(get_scan_output_table(scanner))
+    if trace:
+        click.echo("Analysis table")
+        _print_table(get_scan_output_table(scanner))
+        click.echo()
 
-    click.echo("\nProgram tokens table")
+    click.echo("Program tokens table")
     _print_table(get_program_tokens_table(scanner))
 
     click.echo("\nIdentifiers table")
@@ -44,8 +58,8 @@ def _scan(input_file):
     return tokens
 
 
-def _syntax_check(input_file):
-    scan_tokens = _scan(input_file)
+def _syntax_check(input_file, trace=False):
+    scan_tokens = _scan(input_file, trace)
 
     click.echo('\n')
 
@@ -61,8 +75,8 @@ def _syntax_check(input_file):
     return syntax_tokens
 
 
-def _rpn(input_file):
-    syntax_tokens = _syntax_check(input_file)
+def _rpn(input_file, trace=False, optimize=False):
+    syntax_tokens = _syntax_check(input_file, trace)
 
     rpn_builder = RPNBuilder(syntax_tokens)
     rpn_tokens = rpn_builder.build()
@@ -73,18 +87,97 @@ def _rpn(input_file):
     click.echo('\nResulting RPN')
     click.echo(rpn_tokens)
 
+    if optimize:
+        optimized_tokens = optimize_rpn(rpn_tokens)
+        click.echo(f'\nOptimized RPN: {len(rpn_tokens)} -> {len(optimized_tokens)} tokens')
+        click.echo(optimized_tokens)
+        rpn_tokens = optimized_tokens
+
     return rpn_tokens
 
 
-def _execute(input_file):
-    rpn_tokens = _rpn(input_file)
-    executor = Executor(rpn_tokens)
-    click.echo('\n')
-    output = executor.execute()
+def _stdout_sink():
+    # printed values are shown while program runs
+    return StreamSink(sys.stdout)
+
 
+def _inputs(values_file):
+    # values are asked for interactively unless they are read from file
+    return None if values_file is None else StreamInput(values_file)
+
+
+def _execute(input_file, trace=False, optimize=False, profile=False, values_file=None):
+    rpn_tokens = _rpn(input_file, trace, optimize)
+    executor = Executor(rpn_tokens, profile=profile, inputs=_inputs(values_file),
+                        output=_stdout_sink())
+    click.echo('\n')
     click.echo('\nExecutor output')
-    for item in output:
-        click.echo(item)
+    try:
+        executor.execute()
+    except PKLanguageError as e:
+        click.echo(str(e))
+        exit(1)
+        return
+
+    if profile:
+        click.echo('\nProfile by source line')
+        _print_table(get_line_profile_table(executor.profiler))
+        click.echo('\nProfile by opcode')
+        _print_table(get_opcode_profile_table(executor.profiler))
+
+
+def _stream_execute(input_file, values_file=None):
+    executor = Executor(stream_program(input_file), inputs=_inputs(values_file),
+                        output=_stdout_sink())
+
+    click.echo('Executor output')
+    try:
+        executor.execute()
+    except PKLanguageError as e:
+        click.echo(str(e))
+        exit(1)
+
+
+def _run(input_file, show_time=False, use_cache=True, optimize=False, python=False,
+         values_file=None):
+    timings = {}
+    cache = ProgramCache(optimize=optimize) if use_cache else None
+
+    try:
+        run_source(input_file, timings, cache, optimize, python, _stdout_sink(),
+                   _inputs(values_file))
+    except PKLanguageError as e:
+        click.echo(str(e))
+        exit(1)
+        return
+
+    if show_time:
+        for phase, seconds in timings.items():
+            click.echo(f'{phase:<8} {seconds * 1000:10.3f} ms', err=True)
+        click.echo(f'{"total":<8} {sum(timings.values()) * 1000:10.3f} ms', err=True)
+
+
+def _batch(input_file, vectors_file, workers=None, max_steps=None, use_cache=True,
+           optimize=False, vectorize=False):
+    try:
+        if use_cache:
+            program = ProgramCache(optimize=optimize).compile(input_file.read())
+        else:
+            program = compile_source(input_file, optimize=optimize)
+    except PKLanguageError as e:
+        click.echo(str(e))
+        exit(1)
+        return
+
+    # results are printed in order of vectors as soon as they are ready
+    run = run_vectorized if vectorize else run_batch
+    try:
+        for inputs, output, error in run(program, read_input_vectors(vectors_file),
+                                         workers, max_steps):
+            click.echo(json.dumps({'input': inputs, 'output': output, 'error': error}))
+    except ValueError as e:
+        click.echo(str(e), err=True)
+        exit(1)
 
 
 @click.group()
@@ -100,25 +193,116 @@ def tokens_list():
 @cli.command()
 @click.argument('input_file', type=click.File('r'))
 def scan(input_file):
-    _scan(input_file)
+    _scan(input_file, trace=True)
 
 
 @cli.command()
 @click.argument('input_file', type=click.File('r'))
-def syntax_check(input_file):
-    _syntax_check(input_file)
+@click.option('--trace', is_flag=True, help='Print scanner analysis table.')
+def syntax_check(input_file, trace):
+    _syntax_check(input_file, trace)
 
 
 @cli.command()
 @click.argument('input_file', type=click.File('r'))
-def rpn(input_file):
-    _rpn(input_file)
+@click.option('--trace', is_flag=True, help='Print scanner analysis table.')
+@click.option('-O', 'optimize', is_flag=True, help='Optimize RPN.')
+def rpn(input_file, trace, optimize):
+    _rpn(input_file, trace, optimize)
 
 
 @cli.command()
 @click.argument('input_file', type=click.File('r'))
-def execute(input_file):
-    _execute(input_file)
+@click.option('--trace', is_flag=True, help='Print scanner analysis table.')
+@click.option('--stream', is_flag=True,
+              help='Execute program while it is read, without printing tables.')
+@click.option('-O', 'optimize', is_flag=True, help='Optimize RPN, unless program is streamed.')
+@click.option('--profile', is_flag=True,
+              help='Print executions and time per source line and opcode.')
+@click.option('--input', 'values_file', type=click.File('r'),
+              help='Read input values from file, - for stdin.')
+def execute(input_file, trace, stream, optimize, profile, values_file):
+    if stream and profile:
+        raise click.UsageError('Streamed program can not be profiled.')
+    if stream:
+        _stream_execute(input_file, values_file)
+    else:
+        _execute(input_file, trace, optimize, profile, values_file)
+
+
+@cli.command()
+@click.argument('input_file', type=click.File('r'))
+@click.option('--time', 'show_time', is_flag=True, help='Print time spent in every phase.')
+@click.option('--no-cache', is_flag=True, help='Compile program without compiled programs cache.')
+@click.option('-O', 'optimize', is_flag=True, help='Optimize RPN.')
+@click.option('--python', is_flag=True, help='Translate program into python code and run it.')
+@click.option('--input', 'values_file', type=click.File('r'),
+              help='Read input values from file, - for stdin.')
+def run(input_file, show_time, no_cache, optimize, python, values_file):
+    _run(input_file, show_time, use_cache=not no_cache, optimize=optimize, python=python,
+         values_file=values_file)
+
+
+@cli.command()
+@click.argument('input_file', type=click.File('r'))
+@click.argument('vectors_file', type=click.File('r'))
+@click.option('--workers', type=click.IntRange(min=1),
+              help='Amount of worker processes, all cores by default.')
+@click.option('--max-steps', type=click.IntRange(min=1), help='Steps budget of every run.')
+@click.option('--no-cache', is_flag=True, help='Compile program without compiled programs cache.')
+@click.option('-O', 'optimize', is_flag=True, help='Optimize RPN.')
+@click.option('--vectorize', is_flag=True,
+              help='Evaluate branch-free programs over NumPy arrays, if NumPy is installed.')
+def batch(input_file, vectors_file, workers, max_steps, no_cache, optimize, vectorize):
+    _batch(input_file, vectors_file, workers, max_steps, use_cache=not no_cache,
+           optimize=optimize, vectorize=vectorize)
+
+
+@cli.command()
+@click.option('--output', type=click.File('w'), help='Save results as JSON.')
+@click.option('--repeat', type=click.IntRange(min=1), default=3, show_default=True,
+              help='Runs of every phase, the best time is kept.')
+@click.option('--case', 'cases', multiple=True, type=click.Choice(list(SUITE)),
+              help='Run only these programs of the suite.')
+def benchmark(output, repeat, cases):
+    suite = {name: params for name, params in SUITE.items() if not cases or name in cases}
+    results = run_suite(suite, repeat)
+    _print_table({
+        'headers': ['case', 'phase', 'ms', 'peak KB'],
+        'rows': [[name, phase, f'{result["seconds"] * 1000:.3f}', result['peak_memory'] // 1024]
+                 for name, case in results['cases'].items()
+                 for phase, result in case['phases'].items()],
+    })
+    if output:
+        json.dump(results, output, indent=2)
+
+
+@cli.command()
+@click.argument('baseline_file', type=click.File('r'))
+@click.argument('results_file', type=click.File('r'))
+@click.option('--threshold', type=float, default=0.1, show_default=True,
+              help='Allowed slowdown, 0.1 is 10%.')
+@click.option('--memory-threshold', type=float, default=0.1, show_default=True,
+              help='Allowed growth of peak memory.')
+def benchmark_compare(baseline_file, results_file, threshold, memory_threshold):
+    try:
+        rows = compare_results(json.load(baseline_file), json.load(results_file),
+                               threshold, memory_threshold)
+    except ValueError as e:
+        click.echo(str(e), err=True)
+        exit(1)
+        return
+
+    _print_table({
+        'headers': ['case', 'phase', 'ms', 'time', 'peak KB', 'memory', ''],
+        'rows': [[row['case'], row['phase'], f'{row["seconds"] * 1000:.3f}',
+                  f'{row["time_ratio"]:.2f}x', row['peak_memory'] // 1024,
+                  f'{row["memory_ratio"]:.2f}x', 'REGRESSION' if row['regression'] else '']
+                 for row in rows],
+    })
+    # non-zero exit code fails CI jobs
+    if any(row['regression'] for row in rows):
+        exit(1)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,103 @@
+import csv
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from typing import Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from .bytecode import Program
+from .errors import PKLanguageError
+from .exec import Executor
+
+# input vectors sent to a worker at once, so every task outweighs its transfer
+CHUNK_SIZE = 64
+
+# program of worker process, it is sent once when worker starts
+_worker_program = None
+_worker_max_steps = None
+
+
+def read_input_vectors(input_file: TextIO) -> Iterator[List[int]]:
+    """
+    Yields input values for every program run, one run per line.
+
+    Lines are either JSON arrays of integers or comma separated integers,
+    format is taken from the first non-empty line. Empty lines are skipped.
+    """
+
+    lines = (line for line in input_file if line.strip())
+    first = next(lines, None)
+    if first is None:
+        return
+    lines = chain([first], lines)
+
+    if first.lstrip().startswith('['):
+        for number, line in enumerate(lines, start=1):
+            values = json.loads(line)
+            if not isinstance(values, list) or not all(type(value) is int for value in values):
+                raise ValueError(f'Vector {number}: JSON array of integers expected')
+            yield values
+    else:
+        for number, row in enumerate(csv.reader(lines), start=1):
+            try:
+                yield [int(value) for value in row]
+            except ValueError:
+                raise ValueError(f'Vector {number}: comma separated integers expected')
+
+
+def execute_vector(program: Program, inputs: List[int],
+                   max_steps: Optional[int] = None) -> Tuple[Optional[List[int]], Optional[str]]:
+    """ Executes program with given input values, returns its output and error message. """
+
+    try:
+        return Executor(program, max_steps=max_steps, inputs=inputs).execute(), None
+    except PKLanguageError as e:
+        return None, str(e)
+    except Exception as e:
+        # e.g. division by zero fails this run only
+        return None, f'{e.__class__.__name__}: {e}'
+
+
+def _init_worker(program: Program, max_steps: Optional[int]):
+    global _worker_program, _worker_max_steps
+    _worker_program = program
+    _worker_max_steps = max_steps
+
+
+def _execute_chunk(vectors: List[List[int]]) -> List[tuple]:
+    return [execute_vector(_worker_program, inputs, _worker_max_steps) for inputs in vectors]
+
+
+def run_batch(program: Program, vectors: Iterable[List[int]], workers: Optional[int] = None,
+              max_steps: Optional[int] = None, chunk_size: int = CHUNK_SIZE) -> Iterator[tuple]:
+    """
+    Executes program once for every input vector on a pool of worker processes.
+
+    Yields (inputs, output, error) for every vector in order of vectors, as soon as
+    the chunk containing it is done. Only a few chunks per worker are read
+    ahead, so vectors may come from a file of any size.
+    With a single worker vectors are executed in this process.
+    """
+
+    workers = workers or os.cpu_count() or 1
+    vectors = iter(vectors)
+    if workers == 1:
+        for inputs in vectors:
+            yield (inputs, *execute_vector(program, inputs, max_steps))
+        return
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker,
+                             initargs=(program, max_steps)) as pool:
+        pending = deque()
+        while True:
+            while len(pending) < 2 * workers:
+                chunk = list(islice(vectors, chunk_size))
+                if not chunk:
+                    break
+                pending.append((chunk, pool.submit(_execute_chunk, chunk)))
+            if not pending:
+                break
+            chunk, future = pending.popleft()
+            for inputs, (output, error) in zip(chunk, future.result()):
+                yield inputs, output, error
@@ -0,0 +1,531 @@
+from typing import Iterator, List, Optional
+
+from .errors import PKLSemanticError
+from .tokens import tokens_map
+
+# bumped whenever compiled programs change, so cached ones are not reused
+COMPILER_VERSION = 3
+
+# operation token and the number of arguments it takes from the execution stack
+OPERATIONS = (
+    ('+', 2),
+    ('-', 2),
+    ('*', 2),
+    ('/', 2),
+    ('^', 2),
+    ('<', 2),
+    ('>', 2),
+    ('<=', 2),
+    ('>=', 2),
+    ('==', 2),
+    ('!=', 2),
+    ('print', 1),
+    ('input', 0),
+)
+
+# variables, assignments and control flow are handled by executor loop itself:
+# LOAD_VAR, STORE and DECLARE carry variable slot, JUMP and JUMP_IF_NOT carry
+# target instruction, GOTO and GOTO_IF_NOT take target token index from stack.
+# INCREMENT and COMPARE_JUMP_IF_NOT are superinstructions made by peephole:
+# INCREMENT carries (slot, value) and adds value to the variable in place,
+# COMPARE_JUMP_IF_NOT carries (slot, value, comparison opcode, target)
+# and jumps unless comparison of the variable with value holds.
+# PROFILE carries (opcode, line) of the next instruction and is only put
+# into programs instrumented by profiler
+LOAD_CONST = 0
+LOAD_VAR = 1
+STORE = 2
+DECLARE = 3
+JUMP = 4
+JUMP_IF_NOT = 5
+GOTO = 6
+GOTO_IF_NOT = 7
+INCREMENT = 8
+COMPARE_JUMP_IF_NOT = 9
+PROFILE = 10
+
+OPCODES = {
+    ':=': STORE,
+    'var': DECLARE,
+    'goto': GOTO,
+    'goto_if_not': GOTO_IF_NOT,
+}
+ARITIES = [0, 0, 1, 0, 0, 1, 1, 2, 0, 0, 0]
+FIRST_OPERATION = len(ARITIES)
+for opcode, (operation, numargs) in enumerate(OPERATIONS, start=FIRST_OPERATION):
+    OPCODES[operation] = opcode
+    ARITIES.append(numargs)
+
+OPNAMES = ['LOAD_CONST', 'LOAD_VAR', 'STORE', 'DECLARE', 'JUMP', 'JUMP_IF_NOT', 'GOTO',
+           'GOTO_IF_NOT', 'INCREMENT', 'COMPARE_JUMP_IF_NOT', 'PROFILE'] + [
+    operation for operation, _ in OPERATIONS]
+
+_COMPARISONS = {OPCODES[operation] for operation in ('<', '>', '<=', '>=', '==', '!=')}
+
+# RPN arity of tokens compiled into instructions with their own arity
+_RPN_ARITIES = {
+    ':=': 2,
+    'var': 1,
+    'label': 1,
+}
+
+# operations which leave nothing on the stack
+_NO_RESULT = {'print', 'goto', 'goto_if_not', 'label'}
+
+# labels generated by RPNBuilder are only referenced inside of their top-level statement
+_GENERATED_LABEL_PREFIX = '_label_'
+
+_IDENT_ID = tokens_map['_IDENT'].id
+_CONST_ID = tokens_map['_CONST'].id
+
+
+class Program:
+    """
+    RPN program decoded once for execution.
+
+    Every instruction is an (opcode, arg) pair. For LOAD_CONST arg is an index into
+    constants pool, for variable instructions it is a slot in names, for jumps
+    it is the target instruction index, for operations it is the amount of
+    stack arguments.
+    index_map maps RPN token indexes to instruction indexes.
+    lines keeps source line of every instruction, None where it is unknown.
+    """
+
+    def __init__(self, code: List[tuple], constants: List[int], names: List[str],
+                 index_map: List[int], lines: List[Optional[int]] = None):
+        self.code = code
+        self.constants = constants
+        self.names = names
+        self.index_map = index_map
+        self.lines = [None] * len(code) if lines is None else lines
+
+    def __len__(self):
+        return len(self.code)
+
+    def load(self, index: int):
+        """
+        Makes instruction index available, if program is compiled while executed.
+
+        Returns index of that instruction in code, as code may be shifted,
+        or None when program has ended.
+        """
+
+        return None
+
+    def disassemble(self) -> List[str]:
+        lines = []
+        for index, (opcode, arg) in enumerate(self.code):
+            if opcode == LOAD_CONST:
+                arg = self.constants[arg]
+            elif opcode in (LOAD_VAR, STORE, DECLARE):
+                arg = self.names[arg]
+            elif opcode == INCREMENT:
+                arg = f'{self.names[arg[0]]} {arg[1]}'
+            elif opcode == COMPARE_JUMP_IF_NOT:
+                arg = f'{self.names[arg[0]]} {OPNAMES[arg[2]]} {arg[1]} {arg[3]}'
+            elif opcode == PROFILE:
+                arg = f'{OPNAMES[arg[0]]} {arg[1]}'
+            lines.append(f'{index} {OPNAMES[opcode]} {arg}')
+        return lines
+
+
+def _intern(value, pool: List, pool_index: dict, index=None) -> int:
+    """ Puts value to the pool under the given index or the next free one. """
+
+    if value in pool_index:
+        return pool_index[value]
+    if index is None or (index < len(pool) and pool[index] is not None):
+        # slot may be taken by value which does not come from scanner
+        index = len(pool)
+    if index >= len(pool):
+        pool.extend([None] * (index + 1 - len(pool)))
+    pool[index] = value
+    pool_index[value] = index
+    return index
+
+
+def _scanner_id(token: str, token_id: int):
+    """ Ident or constant id assigned by scanner, if token comes from one. """
+
+    if getattr(token, 'token_id', None) == token_id:
+        return token.ident_id
+    return None
+
+
+def _is_operation(token: str) -> bool:
+    # 'label' declares label, it is resolved by compiler and takes no instruction
+    return token in OPCODES or token == 'label'
+
+
+def _rpn_arity(token: str) -> int:
+    return _RPN_ARITIES.get(token) or ARITIES[OPCODES[token]]
+
+
+def _bind_arguments(tokens: List[str]) -> List[tuple]:
+    """ Returns (consumer token index, argument position) for every token result. """
+
+    consumers = [None] * len(tokens)
+    stack = []
+    for index, token in enumerate(tokens):
+        if _is_operation(token):
+            for position in reversed(range(_rpn_arity(token))):
+                if stack:
+                    consumers[stack.pop()] = (index, position)
+            if token not in _NO_RESULT:
+                stack.append(index)
+        else:
+            stack.append(index)
+    return consumers
+
+
+def _assigned_by(tokens: List[str], consumer: tuple, operations=(':=',)) -> bool:
+    return consumer is not None and consumer[1] == 0 and tokens[consumer[0]] in operations
+
+
+def _is_balanced(tokens: List[str], consumers: List[tuple]) -> bool:
+    """
+    Checks if the stack is empty at every jump and jump target
+    when assignment results are not kept on the stack.
+
+    Otherwise some operation may pick up assignment result left on the stack,
+    so compiler keeps these results like RPN interpreter does.
+    """
+
+    depths = []
+    targets = []
+    depth = 0
+    for index, token in enumerate(tokens):
+        depths.append(depth)
+        if not _is_operation(token):
+            depth += 1
+            continue
+
+        depth -= _rpn_arity(token)
+        if depth < 0:
+            return False
+        if token == ':=':
+            if consumers[index] is not None:
+                return False
+        elif token == 'var':
+            if _assigned_by(tokens, consumers[index]):
+                depth += 1
+        elif token == 'goto' or token == 'goto_if_not' or token == 'label':
+            target = tokens[index - 1] if index else ''
+            if _is_operation(target):
+                # computed target can not be checked
+                return False
+            try:
+                targets.append(int(target))
+            except ValueError:
+                # labels are checked where they are declared
+                pass
+            if depth:
+                return False
+        elif token not in _NO_RESULT:
+            depth += 1
+    depths.append(depth)
+
+    return all(depths[min(target, len(tokens))] == 0 for target in targets)
+
+
+class Compiler:
+    """
+    Turns RPN tokens into instructions, part by part.
+
+    Identifiers and constants are replaced with slots and constants pool indexes,
+    using ids assigned by scanner when tokens carry them.
+    Identifier which is assigned or declared is merged into STORE or DECLARE.
+    Jump target followed by 'goto' or 'goto_if_not' is merged into a single
+    JUMP or JUMP_IF_NOT instruction. Target is either RPN token index,
+    remapped when compilation is finished, or name of a label declared
+    by 'name label' anywhere in the program.
+
+    Compiled instructions are taken from the compiler as soon as their jump
+    targets are known, so program may be executed while it is still compiled.
+    """
+
+    def __init__(self, index_map: bool = True):
+        # instructions which were not taken yet, starting from self.offset,
+        # and their source lines
+        self.code = []
+        self.lines = []
+        self._line = None
+        self.offset = 0
+        self.constants, self._constants_index = [], {}
+        self.names, self._names_index = [], {}
+        # instruction indexes of declared labels
+        self.labels = {}
+        # token index -> instruction index; not kept while streaming
+        self.index_map = [] if index_map else None
+
+        self._token_jumps = []
+        self._label_jumps = {}
+        self._tokens_count = 0
+
+    def _position(self) -> int:
+        return self.offset + len(self.code)
+
+    def _jump(self, opcode: int, target) -> None:
+        if isinstance(target, int):
+            self._token_jumps.append(self._position())
+        elif target in self.labels:
+            target = self.labels[target]
+        else:
+            self._label_jumps.setdefault(target, []).append(self._position())
+        self.code.append((opcode, target))
+
+    def _declare_label(self, name: str) -> None:
+        position = self._position()
+        self.labels[name] = position
+        for index in self._label_jumps.pop(name, ()):
+            opcode, _ = self.code[index - self.offset]
+            self.code[index - self.offset] = (opcode, position)
+
+    def compile(self, tokens: List[str]) -> None:
+        """ Compiles next part of the program, e.g. a top-level statement. """
+
+        consumers = _bind_arguments(tokens)
+        keep_results = not _is_balanced(tokens, consumers)
+        # slots assigned or declared by STORE and DECLARE, by their token index
+        lvalues = {}
+        index_map = self.index_map
+        code = self.code
+        lines = self.lines
+        # tokens made by RPN builder have no line, they take one of the previous token
+        line = self._line
+
+        index = 0
+        while index < len(tokens):
+            lines.extend([line] * (len(code) - len(lines)))
+            token = tokens[index]
+            line = getattr(token, 'numline', None) or line
+            consumer = consumers[index]
+            if index_map is not None:
+                index_map.append(self._position())
+            index += 1
+
+            if token == ':=' or token == 'var':
+                slot = lvalues.get(index - 1)
+                if slot is None:
+                    raise PKLSemanticError(f'Identifier expected by {token}')
+                code.append((OPCODES[token], slot))
+                if token == 'var' and _assigned_by(tokens, consumer):
+                    lvalues[consumer[0]] = slot
+                elif keep_results:
+                    code.append((LOAD_VAR, slot))
+                continue
+
+            if token in OPCODES:
+                opcode = OPCODES[token]
+                code.append((opcode, ARITIES[opcode]))
+                continue
+
+            next_token = tokens[index] if index < len(tokens) else None
+            if next_token == 'goto' or next_token == 'goto_if_not' or next_token == 'label':
+                # both target and jump tokens refer to the jump instruction
+                if index_map is not None:
+                    index_map.append(self._position())
+                line = getattr(next_token, 'numline', None) or line
+                index += 1
+                try:
+                    target = int(token)
+                except ValueError:
+                    target = str(token)
+                if next_token == 'label':
+                    self._declare_label(target)
+                else:
+                    self._jump(JUMP if next_token == 'goto' else JUMP_IF_NOT, target)
+                continue
+
+            try:
+                value = int(token)
+            except ValueError:
+                slot = _intern(str(token), self.names, self._names_index,
+                               _scanner_id(token, _IDENT_ID))
+                if _assigned_by(tokens, consumer, (':=', 'var')):
+                    lvalues[consumer[0]] = slot
+                else:
+                    code.append((LOAD_VAR, slot))
+                continue
+
+            const_index = _intern(value, self.constants, self._constants_index,
+                                  _scanner_id(token, _CONST_ID))
+            code.append((LOAD_CONST, const_index))
+
+        lines.extend([line] * (len(code) - len(lines)))
+        self._line = line
+        self._tokens_count += len(tokens)
+        if index_map is None:
+            # generated labels are not referenced outside of their statement
+            for name in [name for name in self.labels
+                         if name.startswith(_GENERATED_LABEL_PREFIX)]:
+                if name not in self._label_jumps:
+                    del self.labels[name]
+
+    def take_ready(self) -> List[tuple]:
+        """ Takes compiled instructions up to the first one with unknown jump target. """
+
+        end = len(self.code)
+        for positions in self._label_jumps.values():
+            end = min(end, positions[0] - self.offset)
+        ready = self.code[:end]
+        del self.code[:end]
+        del self.lines[:end]
+        self.offset += end
+        return ready
+
+    def finish(self) -> Program:
+        """ Resolves token index jump targets and returns the whole program. """
+
+        for name in self._label_jumps:
+            raise PKLSemanticError(f'Undeclared label {name}')
+
+        # jumping past the last token finishes the program
+        self.index_map.append(self._position())
+        for index in self._token_jumps:
+            opcode, target = self.code[index]
+            self.code[index] = (opcode, self.index_map[min(target, self._tokens_count)])
+
+        return Program(self.code, self.constants, self.names, self.index_map, self.lines)
+
+
+def _fuse(code: List[tuple], index: int, targets: set, constants: List[int]):
+    """ Superinstruction replacing 4 instructions from the index, if they make one. """
+
+    if index + 4 > len(code) or any(position in targets for position in range(index + 1, index + 4)):
+        return None
+    (load_var, slot), (load_const, const_index), (operation, _), (last, last_arg) = \
+        code[index:index + 4]
+    if load_var != LOAD_VAR or load_const != LOAD_CONST:
+        return None
+    if operation == OPCODES['+'] and last == STORE and last_arg == slot:
+        return INCREMENT, (slot, constants[const_index])
+    if operation in _COMPARISONS and last == JUMP_IF_NOT:
+        return COMPARE_JUMP_IF_NOT, (slot, constants[const_index], operation, last_arg)
+    return None
+
+
+def peephole(program: Program) -> Program:
+    """
+    Fuses common instruction sequences into superinstructions:
+
+        LOAD_VAR x, LOAD_CONST c, +, STORE x -> INCREMENT (x, c)
+        LOAD_VAR x, LOAD_CONST c, <, JUMP_IF_NOT t -> COMPARE_JUMP_IF_NOT (x, c, <, t)
+
+    Sequences with jump target inside are left as they are. Targets are remapped.
+    """
+
+    code = program.code
+    targets = {arg for opcode, arg in code if opcode == JUMP or opcode == JUMP_IF_NOT}
+    if any(opcode == GOTO or opcode == GOTO_IF_NOT for opcode, _ in code):
+        # computed jumps may lead to any token
+        targets.update(program.index_map)
+
+    fused_code = []
+    # superinstruction takes line of its first instruction
+    fused_lines = []
+    # instruction index -> fused instruction index
+    index_map = []
+    index = 0
+    while index < len(code):
+        instruction = _fuse(code, index, targets, program.constants)
+        fused_lines.append(program.lines[index])
+        if instruction is None:
+            index_map.append(len(fused_code))
+            fused_code.append(code[index])
+            index += 1
+        else:
+            index_map += [len(fused_code)] * 4
+            fused_code.append(instruction)
+            index += 4
+    index_map.append(len(fused_code))
+
+    for index, (opcode, arg) in enumerate(fused_code):
+        if opcode == JUMP or opcode == JUMP_IF_NOT:
+            fused_code[index] = (opcode, index_map[arg])
+        elif opcode == COMPARE_JUMP_IF_NOT:
+            fused_code[index] = (opcode, arg[:3] + (index_map[arg[3]],))
+
+    return Program(fused_code, program.constants, program.names,
+                   [index_map[index] for index in program.index_map], fused_lines)
+
+
+def compile_rpn(tokens: List[str], superinstructions: bool = True) -> Program:
+    """ Turns RPN tokens of the whole program into instructions. """
+
+    compiler = Compiler()
+    compiler.compile(tokens)
+    program = compiler.finish()
+    if superinstructions:
+        program = peephole(program)
+    return program
+
+
+class ProgramStream(Program):
+    """
+    Program compiled from RPN chunks, e.g. top-level statements, while it is executed.
+
+    Only instructions which may still be executed are kept in code: those after
+    the current one, declared labels and targets of kept jumps. Instructions
+    before them are dropped, so long programs run in bounded memory;
+    self.base is the global index of the first kept instruction.
+    """
+
+    # code is not compacted until it grows beyond this size
+    COMPACT_SIZE = 4096
+
+    def __init__(self, chunks: Iterator[List[str]]):
+        self._compiler = Compiler(index_map=False)
+        super().__init__([], self._compiler.constants, self._compiler.names, None)
+        self._chunks = chunks
+        self.base = 0
+        self._compact_at = self.COMPACT_SIZE
+
+    def load(self, index: int) -> Optional[int]:
+        while index >= len(self.code):
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self._append(self._compiler.take_ready())
+                if index >= len(self.code):
+                    return None
+                break
+            self._compiler.compile(chunk)
+            self._append(self._compiler.take_ready())
+
+        if len(self.code) >= self._compact_at:
+            index = self._compact(index)
+        return index
+
+    def _append(self, instructions: List[tuple]):
+        base = self.base
+        for opcode, arg in instructions:
+            if opcode == JUMP or opcode == JUMP_IF_NOT:
+                arg -= base
+            self.code.append((opcode, arg))
+
+    def _compact(self, index: int) -> int:
+        """ Drops instructions which can not be executed anymore, returns shifted index. """
+
+        start = index
+        if self._compiler.code:
+            # instructions waiting for their labels may jump to any kept one
+            start = 0
+        for position in self._compiler.labels.values():
+            start = min(start, position - self.base)
+        # jumps after the start may lead before it, then code after their targets is kept too
+        changed = True
+        while changed and start > 0:
+            changed = False
+            for opcode, arg in self.code[start:]:
+                if (opcode == JUMP or opcode == JUMP_IF_NOT) and arg < start:
+                    start = arg
+                    changed = True
+
+        if start > 0:
+            del self.code[:start]
+            self.base += start
+            for position, (opcode, arg) in enumerate(self.code):
+                if opcode == JUMP or opcode == JUMP_IF_NOT:
+                    self.code[position] = (opcode, arg - start)
+        self._compact_at = max(self.COMPACT_SIZE, 2 * len(self.code))
+        return index - start
@@ -0,0 +1,178 @@
+import hashlib
+import importlib.util
+import marshal
+import os
+import tempfile
+import time
+from io import StringIO
+from types import CodeType
+from typing import Dict, Optional, Tuple
+
+from .bytecode import COMPILER_VERSION, Program
+from .codegen import compile_python
+from .pipeline import _timed, compile_source
+
+DEFAULT_DIRECTORY = os.environ.get('PKL_CACHE_DIR') or os.path.join(
+    os.path.expanduser('~'), '.cache', 'pannkotsky-lang')
+DEFAULT_MAX_SIZE = 64 * 2 ** 20
+
+_SUFFIX = '.pklc'
+
+
+class ProgramCache:
+    """
+    On-disk cache of compiled programs, like __pycache__ for python modules.
+
+    Entries are keyed by hash of the source and compiler version and written
+    atomically. When the cache grows beyond max_size bytes, least recently
+    used entries are evicted. Optimized programs are cached apart from others,
+    so are python translations of programs.
+    """
+
+    def __init__(self, directory: str = DEFAULT_DIRECTORY, max_size: int = DEFAULT_MAX_SIZE,
+                 optimize: bool = False):
+        self.directory = directory
+        self.max_size = max_size
+        self.optimize = optimize
+
+    def key(self, source: str, python: bool = False) -> str:
+        version = str(COMPILER_VERSION)
+        if python:
+            # code objects are marshalled in format of the running python
+            version += '-py-' + importlib.util.MAGIC_NUMBER.hex()
+        if self.optimize:
+            version += '-O'
+        digest = hashlib.sha256(f'{version}\n'.encode())
+        digest.update(source.encode())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + _SUFFIX)
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _load(self, path: str, size: int) -> Optional[tuple]:
+        """ Reads entry of the given tuple size, written by the current compiler. """
+
+        try:
+            with open(path, 'rb') as f:
+                entry = marshal.load(f)
+        except FileNotFoundError:
+            return None
+        except (EOFError, ValueError, TypeError):
+            # broken entry or one written by another python version
+            self._remove(path)
+            return None
+        if not isinstance(entry, tuple) or len(entry) != size:
+            self._remove(path)
+            return None
+        if entry[0] != COMPILER_VERSION:
+            return None
+
+        # recently used entries are evicted last
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry[1:]
+
+    def get(self, source: str) -> Optional[Program]:
+        entry = self._load(self._path(self.key(source)), 6)
+        if entry is None:
+            return None
+        return Program(*entry)
+
+    def put(self, source: str, program: Program):
+        self._store(self._path(self.key(source)), (
+            COMPILER_VERSION, program.code, program.constants, program.names,
+            program.index_map, program.lines))
+
+    def get_python(self, source: str) -> Optional[CodeType]:
+        entry = self._load(self._path(self.key(source, python=True)), 2)
+        if entry is None:
+            return None
+        return entry[0]
+
+    def put_python(self, source: str, code: CodeType):
+        self._store(self._path(self.key(source, python=True)), (COMPILER_VERSION, code))
+
+    def _store(self, path: str, entry: tuple):
+        os.makedirs(self.directory, exist_ok=True)
+        data = marshal.dumps(entry)
+
+        # readers see either the whole entry or none
+        fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            self._remove(temp_path)
+            raise
+
+        self._evict(len(data), keep=path)
+
+    def _evict(self, kept_size: int, keep: str):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(_SUFFIX) or entry.path == keep:
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+
+        total_size = kept_size + sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            self._remove(path)
+            total_size -= size
+
+    def compile(self, source: str, timings: Optional[Dict[str, float]] = None) -> Program:
+        """ Loads compiled program from the cache or compiles and caches it. """
+
+        start = time.perf_counter()
+        program = self.get(source)
+        if program is not None:
+            if timings is not None:
+                timings['cache'] = time.perf_counter() - start
+            return program
+
+        program = compile_source(StringIO(source), timings, self.optimize)
+        try:
+            self.put(source, program)
+        except OSError:
+            # cache is not writable, program is still usable
+            pass
+        return program
+
+    def compile_python(self, source: str, timings: Optional[Dict[str, float]] = None
+                       ) -> Tuple[Program, Optional[CodeType]]:
+        """
+        Loads compiled program and its python translation from the cache
+        or makes and caches them. Translation is None if program can not be translated.
+        """
+
+        program = self.compile(source, timings)
+        start = time.perf_counter()
+        code = self.get_python(source)
+        if code is not None:
+            if timings is not None:
+                timings['cache'] = timings.get('cache', 0) + time.perf_counter() - start
+            return program, code
+
+        code = _timed(timings, 'codegen', compile_python, program)
+        if code is None:
+            return program, None
+        try:
+            self.put_python(source, code)
+        except OSError:
+            pass
+        return program, code
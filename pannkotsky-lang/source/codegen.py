@@ -0,0 +1,312 @@
+from types import CodeType
+from typing import Iterable, List, Optional, Union
+
+from .bytecode import (COMPARE_JUMP_IF_NOT, DECLARE, FIRST_OPERATION, GOTO, GOTO_IF_NOT,
+                       INCREMENT, JUMP, JUMP_IF_NOT, LOAD_CONST, LOAD_VAR, OPCODES, STORE,
+                       Program)
+from .exec import Executor
+from .inputs import InputProvider
+from .output import OutputSink
+
+# generated module defines this function taking input and print callables
+FUNCTION_NAME = 'pkl_program'
+
+_PYTHON_OPERATORS = {
+    OPCODES['+']: '+',
+    OPCODES['-']: '-',
+    OPCODES['*']: '*',
+    OPCODES['/']: '//',
+    OPCODES['^']: '**',
+    OPCODES['<']: '<',
+    OPCODES['>']: '>',
+    OPCODES['<=']: '<=',
+    OPCODES['>=']: '>=',
+    OPCODES['==']: '==',
+    OPCODES['!=']: '!=',
+}
+_COMPARISON_OPERATORS = {'<', '>', '<=', '>=', '==', '!='}
+_PRINT = OPCODES['print']
+_INPUT = OPCODES['input']
+
+_INDENT = '    '
+
+
+class _Unsupported(Exception):
+    """ Program can not be translated, it is executed by Executor. """
+
+
+def _check_condition(condition):
+    # executor accepts boolean conditions only
+    assert isinstance(condition, bool)
+    return condition
+
+
+def _conditional_jumps(code: List[tuple]) -> Iterable[tuple]:
+    for index, (opcode, arg) in enumerate(code):
+        if opcode == JUMP_IF_NOT:
+            yield index, arg
+        elif opcode == COMPARE_JUMP_IF_NOT:
+            yield index, arg[3]
+
+
+def _is_structured(code: List[tuple]) -> bool:
+    """
+    Checks if conditional jumps make nested 'if' and 'repeat ... until' blocks.
+
+    Forward jump skips 'if' block [jump, target), backward one repeats
+    the loop [target, jump]. Blocks must not overlap partially and
+    nothing may jump inside of a block, except for its own jumps.
+    """
+
+    jumps = list(_conditional_jumps(code))
+    blocks = [(index, target) if target > index else (target, index + 1)
+              for index, target in jumps]
+
+    stack = []
+    for start, end in sorted(blocks, key=lambda block: (block[0], -block[1])):
+        while stack and stack[-1][1] <= start:
+            stack.pop()
+        if stack and end > stack[-1][1]:
+            return False
+        stack.append((start, end))
+
+    return all(start <= index < end
+               for index, target in jumps
+               for start, end in blocks if start < target < end)
+
+
+class _Generator:
+    """ Translates instructions into python statements, keeping operands as expressions. """
+
+    def __init__(self, program: Program):
+        self.program = program
+        self.code = program.code
+        self.lines = []
+        self._temporaries = 0
+        # names may have gaps, e.g. after declarations dropped by optimize_rpn
+        self.variables = [f'v_{name}' if name is not None and name.isidentifier() else f'_v{slot}'
+                          for slot, name in enumerate(program.names)]
+        # backward jumps by their target, i.e. loops by their start
+        self._loops = {}
+        for index, target in _conditional_jumps(self.code):
+            if target <= index:
+                self._loops.setdefault(target, []).append(index)
+
+    def emit(self, indent: int, statement: str):
+        self.lines.append(_INDENT * indent + statement)
+
+    def _temporary(self) -> str:
+        self._temporaries += 1
+        return f'_t{self._temporaries}'
+
+    def _flush(self, stack: list, indent: int):
+        """ Evaluates expressions left on the stack before variables they read change. """
+
+        for position, (expression, is_bool) in enumerate(stack):
+            # temporaries and constants do not change
+            if not (expression.startswith('_t') or expression.strip('(-)').isdigit()):
+                name = self._temporary()
+                self.emit(indent, f'{name} = {expression}')
+                stack[position] = (name, is_bool)
+
+    def straight(self, index: int, stack: list, indent: int):
+        """ Translates instruction which does not jump. """
+
+        opcode, arg = self.code[index]
+        if opcode == LOAD_CONST:
+            value = self.program.constants[arg]
+            stack.append((f'({value})' if value < 0 else str(value), False))
+        elif opcode == LOAD_VAR:
+            stack.append((self.variables[arg], False))
+        elif opcode == STORE:
+            expression, _ = stack.pop()
+            self._flush(stack, indent)
+            self.emit(indent, f'{self.variables[arg]} = {expression}')
+        elif opcode == DECLARE:
+            self._flush(stack, indent)
+            self.emit(indent, f'{self.variables[arg]} = None')
+        elif opcode == INCREMENT:
+            slot, value = arg
+            self._flush(stack, indent)
+            variable = self.variables[slot]
+            self.emit(indent, f'{variable} = {variable} + {f"({value})" if value < 0 else value}')
+        elif opcode == _PRINT:
+            expression, _ = stack.pop()
+            self.emit(indent, f'_print({expression})')
+        elif opcode == _INPUT:
+            # input is read in order of the program, whenever its value is used
+            name = self._temporary()
+            self.emit(indent, f'{name} = _input()')
+            stack.append((name, False))
+        elif opcode >= FIRST_OPERATION:
+            (right, _), (left, _) = stack.pop(), stack.pop()
+            operator = _PYTHON_OPERATORS[opcode]
+            stack.append((f'({left} {operator} {right})', operator in _COMPARISON_OPERATORS))
+        else:
+            raise _Unsupported
+
+    def condition(self, index: int, stack: list) -> str:
+        """ Condition of the jump at index, it jumps when condition is false. """
+
+        opcode, arg = self.code[index]
+        if opcode == COMPARE_JUMP_IF_NOT:
+            slot, value, comparison, _ = arg
+            value = f'({value})' if value < 0 else value
+            return f'({self.variables[slot]} {_PYTHON_OPERATORS[comparison]} {value})'
+        expression, is_bool = stack.pop()
+        return expression if is_bool else f'_check_condition({expression})'
+
+    def block(self, start: int, end: int, indent: int):
+        """ Translates instructions [start, end) made of nested 'if' and loop blocks. """
+
+        stack = []
+        index = start
+        while index < end:
+            loop_ends = [jump for jump in self._loops.get(index, ()) if jump < end]
+            if loop_ends:
+                # the outermost loop starting here is translated first
+                jump = max(loop_ends)
+                if stack:
+                    raise _Unsupported
+                self.emit(indent, 'while True:')
+                body_stack = self.block(index, jump, indent + 1)
+                condition = self.condition(jump, body_stack)
+                if body_stack:
+                    raise _Unsupported
+                self.emit(indent + 1, f'if {condition}:')
+                self.emit(indent + 2, 'break')
+                index = jump + 1
+                continue
+
+            opcode, arg = self.code[index]
+            if opcode == JUMP_IF_NOT or opcode == COMPARE_JUMP_IF_NOT:
+                condition = self.condition(index, stack)
+                if stack:
+                    raise _Unsupported
+                target = arg if opcode == JUMP_IF_NOT else arg[3]
+                self.emit(indent, f'if {condition}:')
+                length = len(self.lines)
+                if self.block(index + 1, target, indent + 1):
+                    raise _Unsupported
+                if len(self.lines) == length:
+                    self.emit(indent + 1, 'pass')
+                index = target
+                continue
+
+            self.straight(index, stack, indent)
+            index += 1
+        return stack
+
+    def dispatch(self, indent: int):
+        """ Translates any program into a loop over basic blocks, which jumps choose. """
+
+        code = self.code
+        leaders = {0}
+        for index, (opcode, arg) in enumerate(code):
+            if opcode == JUMP or opcode == JUMP_IF_NOT:
+                leaders.update((arg, index + 1))
+            elif opcode == COMPARE_JUMP_IF_NOT:
+                leaders.update((arg[3], index + 1))
+        leaders = sorted(leader for leader in leaders if leader < len(code))
+
+        self.emit(indent, '_block = 0')
+        self.emit(indent, 'while True:')
+        for position, start in enumerate(leaders):
+            end = leaders[position + 1] if position + 1 < len(leaders) else len(code)
+            self.emit(indent + 1, f'{"if" if position == 0 else "elif"} _block == {start}:')
+            stack = []
+            for index in range(start, end - 1):
+                self.straight(index, stack, indent + 2)
+
+            opcode, arg = code[end - 1]
+            if opcode == JUMP:
+                if stack:
+                    raise _Unsupported
+                self.emit(indent + 2, f'_block = {arg}')
+            elif opcode == JUMP_IF_NOT or opcode == COMPARE_JUMP_IF_NOT:
+                condition = self.condition(end - 1, stack)
+                target = arg if opcode == JUMP_IF_NOT else arg[3]
+                if stack:
+                    raise _Unsupported
+                self.emit(indent + 2, f'_block = {end} if {condition} else {target}')
+            else:
+                self.straight(end - 1, stack, indent + 2)
+                if stack:
+                    raise _Unsupported
+                self.emit(indent + 2, f'_block = {end}')
+        self.emit(indent + 1, 'else:')
+        self.emit(indent + 2, 'break')
+
+
+def generate_python(program: Program) -> Optional[str]:
+    """
+    Translates program into python module defining FUNCTION_NAME(_input, _print).
+
+    Variables become locals, loops and 'if' blocks become python ones.
+    Programs with goto become a loop choosing the next basic block.
+    Returns None for programs with computed jumps or with values left
+    on the stack between blocks, those are executed by Executor.
+    """
+
+    code = program.code
+    if any(opcode == GOTO or opcode == GOTO_IF_NOT for opcode, _ in code):
+        return None
+
+    generator = _Generator(program)
+    generator.emit(0, f'def {FUNCTION_NAME}(_input, _print):')
+    if program.names:
+        generator.emit(1, ' = '.join(generator.variables) + ' = None')
+    try:
+        if not any(opcode == JUMP for opcode, _ in code) and _is_structured(code):
+            if generator.block(0, len(code), 1):
+                raise _Unsupported
+        elif code:
+            generator.dispatch(1)
+    except _Unsupported:
+        return None
+    if len(generator.lines) == 1:
+        generator.emit(1, 'pass')
+    return '\n'.join(generator.lines) + '\n'
+
+
+def compile_python(program: Program) -> Optional[CodeType]:
+    """
+    Compiles python translation of the program, if it can be translated.
+    Translations beyond limits of python compiler, e.g. of deeply nested
+    expressions or loops, are not compiled either.
+    """
+
+    source = generate_python(program)
+    if source is None:
+        return None
+    try:
+        return compile(source, '<pkl>', 'exec')
+    except (SyntaxError, RecursionError, MemoryError):
+        return None
+
+
+class PythonExecutor(Executor):
+    """
+    Executes python translation of the program, falling back to the dispatch loop
+    for programs which can not be translated. Steps are not counted.
+
+    Translation may be given compiled, e.g. when it is taken from ProgramCache.
+    """
+
+    def __init__(self, tokens: Union[List[str], Program], code: Optional[CodeType] = None,
+                 inputs: Union[InputProvider, Iterable[int], None] = None,
+                 output: Optional[OutputSink] = None):
+        super().__init__(tokens, inputs=inputs, output=output)
+        self._code = compile_python(self._program) if code is None else code
+
+    def execute(self):
+        if self._code is None:
+            return super().execute()
+
+        namespace = {'_check_condition': _check_condition}
+        exec(self._code, namespace)
+        try:
+            namespace[FUNCTION_NAME](self._input, self._print)
+        finally:
+            self._sink.flush()
+        return self._sink.values
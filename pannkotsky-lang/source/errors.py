@@ -16,3 +16,7 @@ class PKLSemanticError(PKLanguageError):
 
 class PKLSyntaxError(PKLanguageError):
     pass
+
+
+class PKLRuntimeError(PKLanguageError):
+    pass
@@ -1,14 +1,35 @@
-from inspect import getfullargspec
-from typing import List
+import asyncio
+import hashlib
+import marshal
+import zlib
+from typing import Iterable, List, Optional, Union
 
+from .bytecode import (COMPARE_JUMP_IF_NOT, DECLARE, FIRST_OPERATION, GOTO, INCREMENT, JUMP,
+                       JUMP_IF_NOT, LOAD_CONST, LOAD_VAR, OPERATIONS, PROFILE, STORE, Program,
+                       ProgramStream, compile_rpn)
+from .errors import PKLRuntimeError
+from .inputs import InputPending, InputProvider, IterableInput, PromptInput
+from .output import ListSink, OutputSink
+from .profiler import Profiler
 
-class Jump(Exception):
+# bumped whenever snapshot layout changes
+SNAPSHOT_VERSION = 2
+
+
+class _Paused(Exception):
     pass
 
 
+def _fingerprint(program: Program) -> bytes:
+    # marshal output of equal objects differs with their sharing, so repr is hashed
+    digest = hashlib.sha256(repr(program.code).encode())
+    digest.update(repr(program.constants).encode())
+    digest.update(repr(program.names).encode())
+    return digest.digest()
+
+
 class Executor:
     OPERATIONS_MAP = {
-        ':=': '_assign',
         '+': '_add',
         '-': '_subtract',
         '*': '_multiply',
@@ -20,135 +41,296 @@ class Executor:
         '>=': '_gte',
         '==': '_eq',
         '!=': '_ne',
-        'var': '_declare_ident',
+        # bound to write of the output sink
         'print': '_print',
+        # bound to read of the input provider
         'input': '_input',
-        'label': '_declare_label',
-        'goto': '_goto',
-        'goto_if_not': '_goto_if_not',
     }
 
-    def __init__(self, tokens: List[str]):
-        self._tokens = tokens
+    def __init__(self, tokens: Union[List[str], Program], max_steps: Optional[int] = None,
+                 profile: bool = False,
+                 inputs: Union[InputProvider, Iterable[int], None] = None,
+                 output: Optional[OutputSink] = None):
+        if not isinstance(tokens, Program):
+            tokens = compile_rpn(tokens)
+        self._compiled = tokens
+        # profiled program runs with PROFILE before every instruction
+        self.profiler = Profiler() if profile else None
+        if profile:
+            tokens = Profiler.instrument(tokens)
+        self._step_scale = 2 if profile else 1
+        self._program = tokens
+        # execution state, it is kept between runs and saved by snapshot
         self._current_token_index = 0
-        self._idents_registry = {}
-        self._output = []
+        self._stack = []
+        self.finished = False
+        # executed instructions; straight code is bounded by program size,
+        # so they are counted and checked against max_steps at jumps only
+        self.steps = 0
+        self._max_steps = float('inf') if max_steps is None else max_steps
+        # variables are kept in slots assigned by compiler
+        self._variables = [None] * len(self._program.names)
+        # printed values go to the sink, all of them are kept by default
+        self._sink = ListSink() if output is None else output
+        self._print = self._sink.write
+        # values printed before the snapshot this executor is restored from
+        self._output_offset = 0
+        # user is asked for input values unless they are given
+        if inputs is None:
+            inputs = PromptInput(flush=self._sink.flush)
+        elif not isinstance(inputs, InputProvider):
+            inputs = IterableInput(inputs)
+        self._input = inputs.read
+
+        # handlers are resolved once, opcodes of operations follow the control flow ones
+        self._handlers = [None] * FIRST_OPERATION + [
+            getattr(self, self.OPERATIONS_MAP[operation]) for operation, _ in OPERATIONS
+        ]
 
     def execute(self):
-        execution_stack = []
-
+        """ Executes program until it ends, returns its output. """
+
+        self._run(self._max_steps)
+        return self._sink.values
+
+    def run(self, steps: int) -> bool:
+        """
+        Executes about the given amount of steps more, returns True if program has ended.
+
+        Like steps budget, pause is checked at taken jumps only, so program may run
+        past it by the length of straight code. Paused program is resumed
+        by the next run or execute, possibly after snapshot and restore.
+        """
+
+        self._run(min(self.steps + steps, self._max_steps))
+        return self.finished
+
+    def _run(self, limit):
+        profile_hit = self.profiler.hit if self.profiler else None
+        try:
+            # PROFILE instructions are not counted as steps
+            self._dispatch(self._program, self.steps * self._step_scale,
+                           limit * self._step_scale, profile_hit)
+        except _Paused:
+            pass
+        finally:
+            self._sink.flush()
+            if profile_hit:
+                self.profiler.stop()
+
+    def _dispatch(self, program: Program, steps: int, limit, profile_hit):
+        code = program.code
+        constants = program.constants
+        variables = self._variables
+        index_map = program.index_map
+        handlers = self._handlers
+        execution_stack = self._stack
+        push = execution_stack.append
+        pop = execution_stack.pop
+
+        # control flow operations set the next instruction index directly
+        index = self._current_token_index
+        # index where instructions executed since the last jump start
+        segment = index
         while True:
-            try:
-                token = self._tokens[self._current_token_index]
-            except IndexError:
+            end = len(code)
+            while index < end:
+                opcode, arg = code[index]
+                index += 1
+
+                if opcode == LOAD_CONST:
+                    push(constants[arg])
+                elif opcode == LOAD_VAR:
+                    push(variables[arg])
+                elif opcode == STORE:
+                    variables[arg] = pop()
+                elif opcode >= FIRST_OPERATION:
+                    # arg of operation is the amount of arguments it requires
+                    if arg == 2:
+                        v2 = pop()
+                        res = handlers[opcode](pop(), v2)
+                    elif arg == 1:
+                        res = handlers[opcode](pop())
+                    else:
+                        try:
+                            res = handlers[opcode]()
+                        except InputPending:
+                            # 'input' is executed again when the value comes
+                            index -= 1
+                            self._limit_reached(steps + index - segment, index, pause=False)
+                            raise
+
+                    # if operation returns some result put it back to stack
+                    if res is not None:
+                        push(res)
+                elif opcode == JUMP:
+                    steps += index - segment
+                    index = segment = arg
+                    if steps > limit:
+                        self._limit_reached(steps, index)
+                elif opcode == JUMP_IF_NOT:
+                    condition = pop()
+                    assert isinstance(condition, bool)
+                    if not condition:
+                        steps += index - segment
+                        index = segment = arg
+                        if steps > limit:
+                            self._limit_reached(steps, index)
+                elif opcode == INCREMENT:
+                    slot, value = arg
+                    variables[slot] = variables[slot] + value
+                elif opcode == COMPARE_JUMP_IF_NOT:
+                    slot, value, comparison, target = arg
+                    if not handlers[comparison](variables[slot], value):
+                        steps += index - segment
+                        index = segment = target
+                        if steps > limit:
+                            self._limit_reached(steps, index)
+                elif opcode == DECLARE:
+                    variables[arg] = None
+                elif opcode == GOTO:
+                    steps += index - segment
+                    index = segment = index_map[pop()]
+                    if steps > limit:
+                        self._limit_reached(steps, index)
+                elif opcode == PROFILE:
+                    profile_hit(arg)
+                else:
+                    token_index = pop()
+                    condition = pop()
+                    assert isinstance(condition, bool)
+                    if not condition:
+                        steps += index - segment
+                        index = segment = index_map[token_index]
+                        if steps > limit:
+                            self._limit_reached(steps, index)
+
+            steps += index - segment
+            # program compiled while executed gives more code or ends
+            index = program.load(index)
+            if index is None:
+                index = len(code)
                 break
-            execution_stack.append(token)
-
-            if token in self.OPERATIONS_MAP:
-                # in case of operation extract the amount of arguments it requires
-                # and perform operation
-                operation, args = self._get_operation(execution_stack)
-                try:
-                    res = operation(*args)
-                except Jump:
-                    continue
-
-                # if operation returns some result put it back to stack
-                if res is not None:
-                    execution_stack.append(res)
-
-            self._current_token_index += 1
-
-        return self._output
-
-    def _get_operation(self, execution_stack: List):
-        """ Returns method by operation name and args it requires. """
+            segment = index
+            if len(variables) < len(program.names):
+                variables.extend([None] * (len(program.names) - len(variables)))
 
-        operation_name = self.OPERATIONS_MAP[execution_stack.pop()]
-        operation = getattr(self, operation_name)
-        signature = getfullargspec(operation)
-        numargs = len(signature.args) - 1  # exclude 'self' arg
+        self.steps = steps // self._step_scale
+        self._current_token_index = index
+        self.finished = True
 
-        assert len(execution_stack) >= numargs
+    def _limit_reached(self, steps: int, index: int, pause: bool = True):
+        """ Saves execution state and stops the program with error or pause. """
 
-        args = []
-        for _ in range(numargs):
-            args = [execution_stack.pop()] + args
+        self.steps = steps // self._step_scale
+        self._current_token_index = index
+        if not pause:
+            return
+        if self.steps > self._max_steps:
+            raise PKLRuntimeError(f'Step limit of {self._max_steps} exceeded')
+        raise _Paused
 
-        return operation, args
+    async def execute_async(self, steps_per_slice: int = 10000):
+        """
+        Executes program as asyncio task, returns its output.
 
-    def _get_value(self, arg, target_type=None):
-        if arg in self._idents_registry:
-            return self._idents_registry[arg]
-        return self._cast_value(arg, target_type)
+        Other tasks run between slices of steps and while the program waits
+        for input, e.g. from AsyncInput.
+        """
 
-    @staticmethod
-    def _cast_value(value, target_type=None):
-        if target_type is not None:
-            return target_type(value)
-
-        # if we support more types in future, add type autodetection
-        return int(value)
-
-    ############### Operations ###############
-
-    def _goto(self, token_index: str):
-        self._current_token_index = self._cast_value(token_index, int)
-        raise Jump
-
-    def _goto_if_not(self, condition: bool, token_index: str):
-        assert isinstance(condition, bool)
-        if not condition:
-            self._goto(token_index)
-
-    def _declare_ident(self, ident: str) -> str:
-        self._idents_registry[ident] = None
-        return ident
-
-    def _assign(self, ident: str, value) -> str:
-        self._idents_registry[ident] = self._get_value(value)
-        return ident
-
-    def _print(self, arg):
-        self._output.append(self._get_value(arg))
-
-    def _input(self):
         while True:
-            inp = input("Enter integer number: ")
             try:
-                return int(inp)
-            except ValueError:
-                print(f"{inp} is not a valid integer number")
+                if self.run(steps_per_slice):
+                    return self._sink.values
+            except InputPending as e:
+                await e.provider.wait()
+            else:
+                await asyncio.sleep(0)
+
+    @property
+    def output(self) -> list:
+        """ Values printed since the executor is created or restored, which sink keeps. """
+
+        return self._sink.values
+
+    @property
+    def output_cursor(self) -> int:
+        """ Amount of values printed by the program, including ones before restore. """
+
+        return self._output_offset + self._sink.count
+
+    def snapshot(self) -> bytes:
+        """
+        Saves execution state of paused program: next instruction, stack, variables,
+        steps and output cursor. Output itself is not saved, it is taken by caller.
+        """
+
+        if isinstance(self._program, ProgramStream):
+            raise ValueError('Program compiled while executed can not be saved')
+        return zlib.compress(marshal.dumps((
+            SNAPSHOT_VERSION,
+            _fingerprint(self._compiled),
+            self._current_token_index // self._step_scale,
+            self._stack,
+            self._variables,
+            self.steps,
+            self.output_cursor,
+            self.finished,
+        )))
+
+    @classmethod
+    def restore(cls, tokens: Union[List[str], Program], snapshot: bytes,
+                **kwargs) -> 'Executor':
+        """ Executor of the program which continues from the snapshot. """
+
+        executor = cls(tokens, **kwargs)
+        try:
+            (version, fingerprint, index, stack, variables, steps, output_cursor,
+             finished) = marshal.loads(zlib.decompress(snapshot))
+        except (zlib.error, EOFError, ValueError, TypeError):
+            raise ValueError('Broken snapshot')
+        if version != SNAPSHOT_VERSION or fingerprint != _fingerprint(executor._compiled):
+            raise ValueError('Snapshot is taken from another program')
+
+        executor._current_token_index = index * executor._step_scale
+        executor._stack[:] = stack
+        executor._variables[:] = variables
+        executor.steps = steps
+        executor._output_offset = output_cursor
+        executor.finished = finished
+        return executor
+
+    ############### Operations ###############
 
     def _add(self, v1, v2):
-        return self._get_value(v1, int) + self._get_value(v2, int)
+        return v1 + v2
 
     def _subtract(self, v1, v2):
-        return self._get_value(v1, int) - self._get_value(v2, int)
+        return v1 - v2
 
     def _multiply(self, v1, v2):
-        return self._get_value(v1, int) * self._get_value(v2, int)
+        return v1 * v2
 
     def _divide(self, v1, v2):
-        return self._get_value(v1, int) // self._get_value(v2, int)
+        return v1 // v2
 
     def _to_power(self, value, power):
-        return self._get_value(value, int) ** self._get_value(power)
+        return value ** power
 
     def _lt(self, v1, v2) -> bool:
-        return self._get_value(v1, int) < self._get_value(v2, int)
+        return v1 < v2
 
     def _lte(self, v1, v2) -> bool:
-        return self._get_value(v1, int) <= self._get_value(v2, int)
+        return v1 <= v2
 
     def _gt(self, v1, v2) -> bool:
-        return self._get_value(v1, int) > self._get_value(v2, int)
+        return v1 > v2
 
     def _gte(self, v1, v2) -> bool:
-        return self._get_value(v1, int) >= self._get_value(v2, int)
+        return v1 >= v2
 
     def _eq(self, v1, v2) -> bool:
-        return self._get_value(v1, int) == self._get_value(v2, int)
+        return v1 == v2
 
     def _ne(self, v1, v2) -> bool:
-        return self._get_value(v1, int) != self._get_value(v2, int)
+        return v1 != v2
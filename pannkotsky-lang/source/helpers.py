@@ -1,4 +1,5 @@
 from .alphabet import ALPHABET, LETTERS, DIGITS
+from .profiler import Profiler
 from .rpn import RPNBuilder
 from .scan import Scanner
 from .tokens import tokens, tokens_map
@@ -38,7 +39,7 @@ def get_scan_output_table(scanner: Scanner):
 
 def get_program_tokens_table(scanner: Scanner):
     headers = ['Line no', 'Token', 'Id', 'Ident/Const id']
-    rows = [scan_token.to_table_row() for scan_token in scanner.scan_tokens]
+    rows = list(scanner.scan_tokens.rows())
     return {
         'headers': headers,
         'rows': rows,
@@ -71,3 +72,27 @@ def get_rpn_table(rpn_builder: RPNBuilder):
         'headers': ['Input symbol', 'Stack', 'Output'],
         'rows': rpn_builder.rpn_steps
     }
+
+
+def _profile_rows(stats: dict, total_time: float):
+    return [
+        [key, count, f'{seconds * 1000:.3f}', f'{seconds / total_time * 100 if total_time else 0:.1f}']
+        for key, (count, seconds) in stats
+    ]
+
+
+def get_line_profile_table(profiler: Profiler):
+    # instructions generated for the program itself have no line
+    stats = sorted(profiler.lines.items(), key=lambda item: (item[0] is None, item[0] or 0))
+    return {
+        'headers': ['Line', 'Executions', 'Time, ms', 'Time, %'],
+        'rows': _profile_rows(stats, profiler.total_time),
+    }
+
+
+def get_opcode_profile_table(profiler: Profiler):
+    stats = sorted(profiler.opcodes.items(), key=lambda item: item[1][1], reverse=True)
+    return {
+        'headers': ['Opcode', 'Executions', 'Time, ms', 'Time, %'],
+        'rows': _profile_rows(stats, profiler.total_time),
+    }
@@ -0,0 +1,129 @@
+import asyncio
+from collections import deque
+from typing import Callable, Iterable, List, Optional, TextIO
+
+from .errors import PKLRuntimeError
+
+
+class InputPending(Exception):
+    """ Raised by provider which has no value yet, execution is resumed when it comes. """
+
+    def __init__(self, provider: 'AsyncInput'):
+        super().__init__('Input value is not available yet')
+        self.provider = provider
+
+
+class InputProvider:
+    """ Gives values read by 'input' operation. """
+
+    def read(self) -> int:
+        raise NotImplementedError
+
+
+def _parse(words: List[str]) -> List[int]:
+    values = []
+    for word in words:
+        try:
+            values.append(int(word))
+        except ValueError:
+            raise PKLRuntimeError(f'{word} is not a valid integer number')
+    return values
+
+
+class PromptInput(InputProvider):
+    """
+    Asks user for every value until a valid one is entered.
+    Buffered output is flushed first, so values printed before are shown above the prompt.
+    """
+
+    def __init__(self, flush: Optional[Callable[[], None]] = None):
+        self._flush = flush
+
+    def read(self) -> int:
+        if self._flush is not None:
+            self._flush()
+        while True:
+            inp = input("Enter integer number: ")
+            try:
+                return int(inp)
+            except ValueError:
+                print(f"{inp} is not a valid integer number")
+
+
+class IterableInput(InputProvider):
+    """ Takes values from iterable, e.g. a list. """
+
+    def __init__(self, values: Iterable[int]):
+        self._values = iter(values)
+
+    def read(self) -> int:
+        value = next(self._values, None)
+        if value is None:
+            raise PKLRuntimeError('No more input values')
+        return value
+
+
+class StreamInput(InputProvider):
+    """ Reads whitespace separated values from a text stream, e.g. a file or stdin, in chunks. """
+
+    def __init__(self, stream: TextIO, chunk_size: int = 2 ** 16):
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._values = deque()
+        # word which may continue in the next chunk
+        self._tail = ''
+
+    def read(self) -> int:
+        while not self._values:
+            if not self._fill():
+                raise PKLRuntimeError('No more input values')
+        return self._values.popleft()
+
+    def _fill(self) -> bool:
+        chunk = self._stream.read(self._chunk_size)
+        if not chunk:
+            words, self._tail = self._tail.split(), ''
+            self._values.extend(_parse(words))
+            return bool(words)
+
+        words = (self._tail + chunk).split()
+        self._tail = ''
+        if words and not chunk[-1].isspace():
+            self._tail = words.pop()
+        self._values.extend(_parse(words))
+        return True
+
+
+class AsyncInput(InputProvider):
+    """
+    Values fed by asyncio code, e.g. from a request or websocket.
+
+    When no value is fed yet, read raises InputPending and Executor.execute_async
+    waits for the next feed. After close the program gets no more values.
+    """
+
+    def __init__(self):
+        self._values = deque()
+        self._closed = False
+        self._fed = asyncio.Event()
+
+    def feed(self, text: str):
+        """ Adds whitespace separated values. """
+
+        self._values.extend(_parse(text.split()))
+        self._fed.set()
+
+    def close(self):
+        self._closed = True
+        self._fed.set()
+
+    def read(self) -> int:
+        if self._values:
+            return self._values.popleft()
+        if self._closed:
+            raise PKLRuntimeError('No more input values')
+        raise InputPending(self)
+
+    async def wait(self):
+        await self._fed.wait()
+        self._fed.clear()
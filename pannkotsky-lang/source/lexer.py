@@ -0,0 +1,200 @@
+import mmap
+import re
+
+from .alphabet import ALPHABET
+from .errors import PKLLexicalError
+from .scan import Scanner
+from .states import (CONSUMING_STATES, ERROR_STATE, TRANSITIONS,
+                     final_state_token_type_map)
+from .tokens import tokens, tokens_map
+
+# states of tokens in progress and of completed ones,
+# which are completed by the first char not continuing them
+_IDENT_STATES = (1, 16)
+_CONST_STATES = (2, 17)
+_SPACE_STATES = (15, 19)
+
+# amount of chars or bytes read from input file at once
+CHUNK_SIZE = 1 << 20
+
+# groups of the pattern
+_IDENT = 1
+_CONST = 2
+_NEWLINE = 3
+
+
+def _chars(state: int, next_state: int) -> set:
+    """ Chars taking transitions table from state to next_state. """
+
+    return {chr(code) for code in range(128) if TRANSITIONS[state][code] == next_state}
+
+
+def _char_class(chars) -> str:
+    return '[' + ''.join(re.escape(char) for char in sorted(chars)) + ']'
+
+
+def _in_progress_pattern(states: tuple) -> str:
+    """ Token which starts and continues in the first state and is completed by the next char. """
+
+    state, completed = states
+    return (f'({_char_class(_chars(0, state))}{_char_class(_chars(state, state))}*)'
+            f'(?={_char_class(_chars(state, completed))})')
+
+
+def _operators_pattern() -> str:
+    """
+    Operators of the tokens list, longest first. The ones which begin longer
+    operators are completed only by a char which does not continue them.
+    """
+
+    operators = sorted((token for token, *_ in tokens
+                        if not token[0].isalpha() and not token.startswith('_') and token != '\n'),
+                       key=len, reverse=True)
+    alternatives = []
+    for operator in operators:
+        continuations = {longer[len(operator)] for longer in operators
+                         if len(longer) > len(operator) and longer.startswith(operator)}
+        alternative = re.escape(operator)
+        if continuations:
+            alternative += f'(?={_char_class(ALPHABET - continuations)})'
+        alternatives.append(alternative)
+    return f'({"|".join(alternatives)})'
+
+
+def _build_pattern() -> str:
+    # spaces are not saved, they are skipped before the token
+    space, _ = _SPACE_STATES
+    return f'{_char_class(_chars(0, space))}*(?:' + '|'.join([
+        _in_progress_pattern(_IDENT_STATES),
+        _in_progress_pattern(_CONST_STATES),
+        '(\n)',
+        _operators_pattern(),
+    ]) + ')'
+
+
+_PATTERN = re.compile(_build_pattern())
+_BYTES_PATTERN = re.compile(_PATTERN.pattern.encode())
+_TOKEN_TYPES = {
+    _IDENT: final_state_token_type_map[_IDENT_STATES[1]],
+    _CONST: final_state_token_type_map[_CONST_STATES[1]],
+}
+# keywords and operators are saved without checks done for idents and constants
+_KEYWORDS = {token: (token_obj.representation, token_obj.id)
+             for token, token_obj in tokens_map.items()}
+_IDENT_ID = tokens_map['_IDENT'].id
+_CONST_ID = tokens_map['_CONST'].id
+_DECLARATIONS = {'var', 'label'}
+
+
+class RegexScanner(Scanner):
+    """
+    Scanner which tokenizes the whole input with one regular expression derived
+    from the tokens list and the transitions table, instead of running the table
+    char by char. It gives the same tokens and errors as Scanner.
+
+    Input is a file, text or binary one, read in chunks of chunk_size, a string
+    or a bytes-like buffer, e.g. mmap of a file with '\\n' line endings,
+    which is scanned in place. Scan steps are not recorded.
+    """
+
+    def __init__(self, input_f, trace: bool = False, chunk_size: int = CHUNK_SIZE):
+        if trace:
+            raise ValueError('Scan steps are recorded by Scanner only')
+        super().__init__(input_f)
+        self.chunk_size = chunk_size
+
+    def scan(self):
+        if isinstance(self.input_file, (str, bytes, bytearray, mmap.mmap)):
+            self.process_buffer(self.input_file)
+            return self.scan_tokens
+
+        # tokens do not span lines, so chunk is scanned up to its last '\n'
+        # and the rest of it is scanned with the next one
+        tail = None
+        while True:
+            chunk = self.input_file.read(self.chunk_size)
+            if not chunk:
+                break
+            if tail:
+                chunk = tail + chunk
+            end = chunk.rfind(b'\n' if isinstance(chunk, bytes) else '\n') + 1
+            self.process_buffer(chunk, end)
+            tail = chunk[end:]
+        if tail:
+            self.process_buffer(tail)
+        return self.scan_tokens
+
+    def process_line(self, line):
+        # lines are scanned with the pattern, e.g. by iter_tokens
+        self.process_buffer(line)
+
+    def process_buffer(self, buffer, end: int = None):
+        """
+        Saves tokens of complete lines in the buffer up to end, the last one may have no '\\n'.
+        Tokens are sliced out of the buffer, e.g. mmap, which is not copied.
+        """
+
+        is_bytes = not isinstance(buffer, str)
+        pattern = _BYTES_PATTERN if is_bytes else _PATTERN
+        keywords = _KEYWORDS
+        append = self.scan_tokens.append
+        idents = self.idents_map
+        constants = self.constants_map
+        if end is None:
+            end = len(buffer)
+        position = line_start = 0
+        for match in pattern.finditer(buffer, 0, end):
+            if match.start() != position:
+                break
+            kind = match.lastindex
+            position = match.end()
+            token = match.group(kind)
+            if is_bytes:
+                token = token.decode()
+
+            keyword = keywords.get(token)
+            if keyword is not None:
+                token_repr, token_id = keyword
+                append(self.numline, token_repr, token_id, '')
+                self._previous_token_repr = token_repr
+            elif kind == _CONST:
+                append(self.numline, token, _CONST_ID, constants.setdefault(token, len(constants)))
+                self._previous_token_repr = token
+            elif token in idents and self._previous_token_repr not in _DECLARATIONS:
+                append(self.numline, token, _IDENT_ID, idents[token])
+                self._previous_token_repr = token
+            else:
+                # declarations, labels and errors
+                self.current_token = token
+                self.numchar = position - line_start
+                self._save_token(_TOKEN_TYPES[kind])
+            if kind == _NEWLINE:
+                self.numline += 1
+                line_start = position
+
+        if position < end:
+            self._fail(buffer, position, end, line_start)
+        self.current_token = ''
+
+    def _fail(self, buffer, position: int, end: int, line_start: int):
+        """
+        Runs transitions table over the rest of the line where pattern found no token,
+        raising the error Scanner does. Token in progress at the end of input is dropped.
+        """
+
+        newline = b'\n' if not isinstance(buffer, str) else '\n'
+        line_end = buffer.find(newline, position, end)
+        line = buffer[position:end if line_end < 0 else line_end + 1]
+        if not isinstance(line, str):
+            line = bytes(line).decode()
+
+        state = 0
+        index = 0
+        while index < len(line):
+            char = line[index]
+            state = TRANSITIONS[state][ord(char)] if ord(char) < 128 else ERROR_STATE
+            if state == ERROR_STATE:
+                raise PKLLexicalError(f'Unexpected token: {char}', self.numline,
+                                      position - line_start + index + 1)
+            if CONSUMING_STATES[state]:
+                index += 1
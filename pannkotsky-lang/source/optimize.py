@@ -0,0 +1,174 @@
+import operator
+from typing import List
+
+from .bytecode import _NO_RESULT, _is_operation, _rpn_arity
+from .rpn import RPNBuilder
+
+# operations computed at compile time when all their arguments are constants,
+# same as Executor computes them
+_FOLDABLE = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': operator.floordiv,
+    '^': operator.pow,
+    '<': operator.lt,
+    '>': operator.gt,
+    '<=': operator.le,
+    '>=': operator.ge,
+    '==': operator.eq,
+    '!=': operator.ne,
+}
+
+# folded constants bigger than that are left to executor
+_MAX_FOLDED_BITS = 256
+
+_UNKNOWN = object()
+
+
+def _to_labels(tokens: List[str]) -> List[str]:
+    """ Replaces jump targets with labels declared at them, so passes may move tokens. """
+
+    targets = set()
+    for index, token in enumerate(tokens):
+        if token == 'goto' or token == 'goto_if_not':
+            # computed targets are checked by caller
+            targets.add(min(int(tokens[index - 1]), len(tokens)))
+
+    output = []
+    for index, token in enumerate(tokens):
+        if index in targets:
+            output += [f'_label_{index}', 'label']
+        next_token = tokens[index + 1] if index + 1 < len(tokens) else None
+        if next_token == 'goto' or next_token == 'goto_if_not':
+            token = f'_label_{min(int(token), len(tokens))}'
+        output.append(token)
+    if len(tokens) in targets:
+        output += [f'_label_{len(tokens)}', 'label']
+    return output
+
+
+def _fold_constants(tokens: List[str]) -> List[str]:
+    """
+    Replaces operations on constants with their results.
+
+    Comparisons can not be put back to RPN, their results are only used
+    to remove conditional jumps: jump on true condition is dropped and jump
+    on false one becomes unconditional.
+    """
+
+    output = []
+    # start of every stack value in the output and the value itself, if it is known
+    stack = []
+    for token in tokens:
+        if not _is_operation(token):
+            try:
+                value = int(token)
+            except ValueError:
+                value = _UNKNOWN
+            stack.append((len(output), value))
+            output.append(token)
+            continue
+
+        arity = _rpn_arity(token)
+        args = stack[len(stack) - arity:]
+        del stack[len(stack) - arity:]
+        start = args[0][0] if args else len(output)
+        values = [value for _, value in args]
+
+        if token in _FOLDABLE and _UNKNOWN not in values:
+            if token == '^' and abs(values[1]) * values[0].bit_length() > _MAX_FOLDED_BITS:
+                # result is too big to fold, it is not computed even in dead code
+                value = _UNKNOWN
+            else:
+                try:
+                    value = _FOLDABLE[token](*values)
+                except ZeroDivisionError:
+                    value = _UNKNOWN
+            if isinstance(value, bool):
+                output.append(token)
+                stack.append((start, value))
+                continue
+            if isinstance(value, int) and value.bit_length() <= _MAX_FOLDED_BITS:
+                del output[start:]
+                output.append(str(value))
+                stack.append((start, value))
+                continue
+
+        if token == 'goto_if_not' and isinstance(values[0], bool):
+            label = output[args[1][0]]
+            del output[start:]
+            if not values[0]:
+                output += [label, 'goto']
+            continue
+
+        output.append(token)
+        if token == 'label':
+            # jump may bring other values here
+            stack = [(position, _UNKNOWN) for position, _ in stack]
+        elif token not in _NO_RESULT:
+            stack.append((start, _UNKNOWN))
+    return output
+
+
+def _drop_unreachable(tokens: List[str]) -> List[str]:
+    """ Drops tokens which can not be reached from the program start. """
+
+    labels = {tokens[index - 1]: index - 1 for index, token in enumerate(tokens)
+              if token == 'label'}
+    reachable = [False] * len(tokens)
+    starts = [0]
+    while starts:
+        index = starts.pop()
+        while index < len(tokens) and not reachable[index]:
+            reachable[index] = True
+            token = tokens[index]
+            if token == 'goto' or token == 'goto_if_not':
+                starts.append(labels[tokens[index - 1]])
+                if token == 'goto':
+                    break
+            index += 1
+
+    return [token for token, is_reachable in zip(tokens, reachable) if is_reachable]
+
+
+def _drop_jumps_to_next(tokens: List[str]) -> List[str]:
+    """ Drops unconditional jumps to the label declared right after them. """
+
+    output = []
+    index = 0
+    while index < len(tokens):
+        if index + 1 < len(tokens) and tokens[index + 1] == 'goto':
+            next_index = index + 2
+            next_labels = set()
+            while next_index + 1 < len(tokens) and tokens[next_index + 1] == 'label':
+                next_labels.add(tokens[next_index])
+                next_index += 2
+            if tokens[index] in next_labels:
+                index += 2
+                continue
+        output.append(tokens[index])
+        index += 1
+    return output
+
+
+def optimize_rpn(tokens: List[str]) -> List[str]:
+    """
+    Folds constant subexpressions, removes jumps on constant conditions
+    and drops unreachable code. Jump targets are remapped.
+
+    Programs with computed jump targets are returned as they are.
+    """
+
+    for index, token in enumerate(tokens):
+        if token == 'goto' or token == 'goto_if_not':
+            try:
+                int(tokens[index - 1])
+            except (ValueError, IndexError):
+                return list(tokens)
+
+    tokens = _to_labels(tokens)
+    tokens = _fold_constants(tokens)
+    tokens = _drop_unreachable(tokens)
+    tokens = _drop_jumps_to_next(tokens)
+    return RPNBuilder.replace_labels(tokens)
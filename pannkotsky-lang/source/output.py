@@ -0,0 +1,96 @@
+from collections import deque
+from typing import Callable, List, TextIO
+
+
+class OutputSink:
+    """
+    Receives values printed by the program.
+
+    write is called for every printed value, flush when execution stops.
+    count is the amount of values written, values are the ones kept by the sink.
+    """
+
+    count = 0
+
+    def write(self, value):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    @property
+    def values(self) -> List:
+        return []
+
+
+class ListSink(OutputSink):
+    """ Keeps all the printed values. """
+
+    def __init__(self):
+        self._values = []
+        # bound append is called directly by executor
+        self.write = self._values.append
+
+    @property
+    def count(self) -> int:
+        return len(self._values)
+
+    @property
+    def values(self) -> List:
+        return self._values
+
+
+class StreamSink(OutputSink):
+    """ Writes every value on its own line to a text stream, in batches of buffer_size values. """
+
+    def __init__(self, stream: TextIO, buffer_size: int = 1024):
+        self.count = 0
+        self._stream = stream
+        self._buffer = []
+        self._buffer_size = buffer_size
+
+    def write(self, value):
+        self.count += 1
+        self._buffer.append(value)
+        if len(self._buffer) >= self._buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self._stream.write('\n'.join(map(str, self._buffer)) + '\n')
+            self._buffer.clear()
+        self._stream.flush()
+
+
+class RingBufferSink(OutputSink):
+    """ Keeps only the last max_size values, so output takes bounded memory. """
+
+    def __init__(self, max_size: int):
+        self.count = 0
+        self._values = deque(maxlen=max_size)
+
+    def write(self, value):
+        self.count += 1
+        self._values.append(value)
+
+    @property
+    def dropped(self) -> int:
+        """ Amount of values which were pushed out by the later ones. """
+
+        return self.count - len(self._values)
+
+    @property
+    def values(self) -> List:
+        return list(self._values)
+
+
+class CallbackSink(OutputSink):
+    """ Passes every value to the callback. """
+
+    def __init__(self, callback: Callable):
+        self.count = 0
+        self._callback = callback
+
+    def write(self, value):
+        self.count += 1
+        self._callback(value)
@@ -0,0 +1,85 @@
+import time
+from typing import Dict, Iterator, List, Optional, TextIO
+
+from .bytecode import Program, ProgramStream, compile_rpn
+from .codegen import PythonExecutor, compile_python
+from .exec import Executor
+from .inputs import InputProvider
+from .lexer import RegexScanner
+from .optimize import optimize_rpn
+from .output import OutputSink
+from .rpn import RPNBuilder
+from .syntax import SyntaxAnalyzer
+
+
+def iter_rpn_chunks(input_file: TextIO) -> Iterator[List[str]]:
+    """
+    Yields RPN of the program top-level statement by statement, while input is read.
+
+    Lexical and syntax errors are raised when the statement containing them is reached.
+    """
+
+    syntax_analyzer = SyntaxAnalyzer(RegexScanner(input_file).iter_tokens())
+    rpn_builder = RPNBuilder(record_steps=False)
+    for statement in syntax_analyzer.iter_statements():
+        yield rpn_builder.process(statement)
+    yield rpn_builder.finish()
+
+
+def stream_program(input_file: TextIO) -> ProgramStream:
+    """ Program which is read, checked and compiled while it is executed. """
+
+    return ProgramStream(iter_rpn_chunks(input_file))
+
+
+def _timed(timings: Optional[Dict[str, float]], phase: str, function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    if timings is not None:
+        timings[phase] = time.perf_counter() - start
+    return result
+
+
+def compile_source(input_file: TextIO, timings: Optional[Dict[str, float]] = None,
+                   optimize: bool = False) -> Program:
+    """
+    Compiles the whole program without collecting diagnostics: scan trace and RPN steps.
+
+    Seconds spent in every phase are put to timings if it is given.
+    """
+
+    scan_tokens = _timed(timings, 'scan', RegexScanner(input_file).scan)
+    syntax_tokens = _timed(timings, 'syntax', SyntaxAnalyzer(scan_tokens).run) or []
+    rpn_tokens = _timed(timings, 'rpn', RPNBuilder(syntax_tokens, record_steps=False).build)
+    if optimize:
+        rpn_tokens = _timed(timings, 'optimize', optimize_rpn, rpn_tokens)
+    return _timed(timings, 'compile', compile_rpn, rpn_tokens)
+
+
+def run_source(input_file: TextIO, timings: Optional[Dict[str, float]] = None,
+               cache=None, optimize: bool = False, python: bool = False,
+               output: Optional[OutputSink] = None,
+               inputs: Optional[InputProvider] = None) -> List[int]:
+    """
+    Compiles and executes the program, returns its output kept by output sink.
+
+    Compiled program is taken from ProgramCache if it is given,
+    then the cache decides whether it is optimized.
+    With python program is translated into python code, which is executed instead.
+    """
+
+    if not python:
+        if cache is None:
+            program = compile_source(input_file, timings, optimize)
+        else:
+            program = cache.compile(input_file.read(), timings)
+        executor = Executor(program, inputs=inputs, output=output)
+        return _timed(timings, 'execute', executor.execute)
+
+    if cache is None:
+        program = compile_source(input_file, timings, optimize)
+        code = _timed(timings, 'codegen', compile_python, program)
+    else:
+        program, code = cache.compile_python(input_file.read(), timings)
+    executor = PythonExecutor(program, code, inputs=inputs, output=output)
+    return _timed(timings, 'execute', executor.execute)
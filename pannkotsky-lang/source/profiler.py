@@ -0,0 +1,74 @@
+from time import perf_counter
+from typing import Dict, List, Optional
+
+from .bytecode import (COMPARE_JUMP_IF_NOT, JUMP, JUMP_IF_NOT, OPNAMES, PROFILE, Program,
+                       ProgramStream)
+
+
+class Profiler:
+    """
+    Counts executions and time of instructions per opcode and per source line.
+
+    Program is instrumented by putting PROFILE instruction before every instruction,
+    so executor spends nothing on profiling when it runs programs as they are.
+    Time between two PROFILE instructions is attributed to the instruction after the first one.
+    """
+
+    def __init__(self):
+        # key -> [executions, seconds]
+        self.opcodes: Dict[str, List] = {}
+        self.lines: Dict[Optional[int], List] = {}
+        self._current = None
+        self._started = 0.0
+
+    @staticmethod
+    def instrument(program: Program) -> Program:
+        """ Returns copy of the whole program with PROFILE before every instruction. """
+
+        if isinstance(program, ProgramStream):
+            raise ValueError('Program compiled while executed can not be profiled')
+
+        code = []
+        for (opcode, arg), line in zip(program.code, program.lines):
+            # instruction index i becomes 2 * i, so jumps lead to PROFILE of their targets
+            if opcode == JUMP or opcode == JUMP_IF_NOT:
+                arg = 2 * arg
+            elif opcode == COMPARE_JUMP_IF_NOT:
+                arg = arg[:3] + (2 * arg[3],)
+            code.append((PROFILE, (opcode, line)))
+            code.append((opcode, arg))
+
+        return Program(code, program.constants, program.names,
+                       [2 * index for index in program.index_map],
+                       [line for line in program.lines for _ in range(2)])
+
+    def hit(self, key: tuple) -> None:
+        """ Called by executor at PROFILE instruction with (opcode, line) of the next one. """
+
+        now = perf_counter()
+        self._stop(now)
+        self._current = key
+        self._started = now
+
+    def stop(self) -> None:
+        """ Attributes time of the last executed instruction. """
+
+        self._stop(perf_counter())
+        self._current = None
+
+    def _stop(self, now: float) -> None:
+        if self._current is None:
+            return
+        opcode, line = self._current
+        elapsed = now - self._started
+        for stats, key in ((self.opcodes, OPNAMES[opcode]), (self.lines, line)):
+            entry = stats.get(key)
+            if entry is None:
+                stats[key] = [1, elapsed]
+            else:
+                entry[0] += 1
+                entry[1] += elapsed
+
+    @property
+    def total_time(self) -> float:
+        return sum(seconds for _, seconds in self.opcodes.values())
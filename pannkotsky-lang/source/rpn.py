@@ -2,27 +2,13 @@ from typing import List
 
 from shortuuid import ShortUUID
 
+from .tokens import ProgramTokens
+
 
 def generate_label_name():
     return f'_label_{ShortUUID().random(length=10)}'
 
 
-def _get_next_index(index, tokens_map):
-    max_index = max(tokens_map.keys())
-    if index == max_index:
-        return index + 1
-
-    if index > max_index:
-        raise KeyError
-
-    try:
-        tokens_map[index + 1]
-    except KeyError:
-        return _get_next_index(index + 1, tokens_map)
-    else:
-        return index + 1
-
-
 class RPNBuilder:
     _PRIORITIES = {
         '(': 0,
@@ -49,13 +35,14 @@ class RPNBuilder:
         '^': 7,
     }
 
-    def __init__(self, tokens: List[str]):
+    def __init__(self, tokens: List[str] = (), record_steps: bool = True):
         self._tokens = tokens
+        self._record_steps = record_steps
         self._stack = []
         self._output = []
 
         self._rpn_steps = []
-        self._previous_output = ()
+        self._previous_output_len = 0
         self._previous_stack = ()
 
     @property
@@ -67,68 +54,108 @@ class RPNBuilder:
         Process input tokens in infix form to postfix form according to Dijkstra algorithm.
         """
 
-        for token in self._tokens:
-            self._previous_output = tuple(self._output)
+        for token in self._operands_with_ids(self._tokens):
+            self._process_token(token)
+
+        # input is empty
+        while self._stack:
+            self._stack_to_output()
+
+        self._output = self.replace_labels(self._output)
+        return self._output
+
+    def process(self, tokens: List[str]) -> List[str]:
+        """
+        Converts next top-level statement of the program and returns its RPN.
+
+        Constructs are closed at the end of top-level statement, so its output is final,
+        but labels are left as declarations, they are resolved by compiler.
+        """
+
+        for token in self._operands_with_ids(tokens):
+            self._process_token(token)
+        output = self._output
+        self._output = []
+        return output
+
+    def finish(self) -> List[str]:
+        """ Returns the rest of RPN when all the statements are processed. """
+
+        while self._stack:
+            self._stack_to_output()
+        return self.process([])
+
+    def _operands_with_ids(self, tokens: List[str]):
+        """
+        Operands of program tokens come out as ProgramToken, keeping ids and line
+        used by compiler. Operations take line of the operands before them.
+        """
+
+        if not isinstance(tokens, ProgramTokens):
+            yield from tokens
+            return
+        priorities = self._PRIORITIES
+        for index, token in enumerate(tokens):
+            yield tokens.program_token(index) if token not in priorities else token
+
+    def _process_token(self, token: str):
+        if self._record_steps:
+            self._previous_output_len = len(self._output)
             self._previous_stack = tuple(self._stack[::-1])
-            priority = self._PRIORITIES.get(token)
-
-            # token is operand
-            if priority is None:
-                self._output.append(token)
-                self._write_step(token)
-                continue
-
-            if token == '(':
-                self._to_stack(token)
-                self._write_step(token)
-                continue
-
-            if token == '\\n' and self._stack[-1] == '\\n' and 'if' in self._stack:
-                # double '\\n' acts as end of 'if' operation
-                assert self._stack.pop() == '\\n'
-                while self._stack and self._stack[-1] != 'if':
-                    assert self._stack[-1].startswith('_label_')
-                    self._output.append(self._stack.pop())
-                assert self._stack.pop() == 'if'
-                self._output.append('label')
-                self._to_stack(token)
-                self._write_step(token)
-                continue
-
-            if token == '\\n' and 'until' in self._stack:
-                while self._stack[-1] != 'until':
-                    self._output.append(self._stack.pop())
-                assert self._stack.pop() == 'until'
+        priority = self._PRIORITIES.get(token)
+
+        # token is operand
+        if priority is None:
+            self._output.append(token)
+            self._write_step(token)
+            return
+
+        if token == '(':
+            self._to_stack(token)
+            self._write_step(token)
+            return
+
+        if token == '\\n' and self._stack[-1] == '\\n' and 'if' in self._stack:
+            # double '\\n' acts as end of 'if' operation
+            assert self._stack.pop() == '\\n'
+            while self._stack and self._stack[-1] != 'if':
                 assert self._stack[-1].startswith('_label_')
                 self._output.append(self._stack.pop())
-                assert self._stack.pop() == 'repeat'
-                self._output.append('goto_if_not')
-                self._to_stack(token)
-                self._write_step(token)
-                continue
-
-            # the only thing which can be in stack and not in self._PRIORITIES is label
-            # giving it priority -1 (it can be pushed out of stack by special case only)
-            while self._stack and self._PRIORITIES.get(self._stack[-1], -1) >= priority:
-                self._stack_to_output()
+            assert self._stack.pop() == 'if'
+            self._output.append('label')
+            self._to_stack(token)
+            self._write_step(token)
+            return
 
-            # either stack is empty or last operation priority is lower
+        if token == '\\n' and 'until' in self._stack:
+            while self._stack[-1] != 'until':
+                self._output.append(self._stack.pop())
+            assert self._stack.pop() == 'until'
+            assert self._stack[-1].startswith('_label_')
+            self._output.append(self._stack.pop())
+            assert self._stack.pop() == 'repeat'
+            self._output.append('goto_if_not')
             self._to_stack(token)
             self._write_step(token)
+            return
 
-        # input is empty
-        while self._stack:
+        # the only thing which can be in stack and not in self._PRIORITIES is label
+        # giving it priority -1 (it can be pushed out of stack by special case only)
+        while self._stack and self._PRIORITIES.get(self._stack[-1], -1) >= priority:
             self._stack_to_output()
 
-        self._output = self._replace_labels(self._output)
-        return self._output
+        # either stack is empty or last operation priority is lower
+        self._to_stack(token)
+        self._write_step(token)
 
     def _write_step(self, token: str):
+        if not self._record_steps:
+            return
         new_stack = tuple(self._stack[::-1])
         self._rpn_steps.append((
             token,
             '\n'.join(new_stack) if new_stack != self._previous_stack else '',
-            '\n'.join(self._output[len(self._previous_output):])
+            '\n'.join(self._output[self._previous_output_len:])
         ))
 
     def _to_stack(self, token: str):
@@ -167,27 +194,25 @@ class RPNBuilder:
             self._output.append(stack_token)
 
     @staticmethod
-    def _replace_labels(tokens: List[str]):
+    def replace_labels(tokens: List[str]):
         """ Replace labels with tokens address. """
 
-        tokens_with_indexes = list(zip(range(len(tokens)), tokens))
-        tokens_map = dict(tokens_with_indexes)
+        # label declaration is a pair of label name and 'label' token,
+        # it points to the token following it in the output without declarations
+        output = []
         labels_map = {}
-        for index, token in tokens_with_indexes[::-1]:
-            if token == 'label':
-                labels_map[tokens[index - 1]] = _get_next_index(index, tokens_map)
-                del tokens_map[index]
-                del tokens_map[index - 1]
-
-        indexes_list = sorted(tokens_map.keys())
-        for label, value in labels_map.items():
-            try:
-                labels_map[label] = str(indexes_list.index(value))
-            except ValueError:
-                labels_map[label] = str(len(indexes_list))
-
-        for index, token in tokens_map.items():
+        index = 0
+        while index < len(tokens):
+            token = tokens[index]
+            if index + 1 < len(tokens) and tokens[index + 1] == 'label':
+                labels_map[token] = str(len(output))
+                index += 2
+            else:
+                output.append(token)
+                index += 1
+
+        for index, token in enumerate(output):
             if token in labels_map:
-                tokens_map[index] = labels_map[token]
+                output[index] = labels_map[token]
 
-        return [tokens_map[index] for index in indexes_list]
+        return output
@@ -1,21 +1,63 @@
+from array import array
+
 from .errors import PKLLexicalError, PKLSemanticError
-from .states import final_state_token_type_map, states_map, UnexpectedTokenError
-from .tokens import tokens_map, ScanToken
+from .states import (CONSUMING_STATES, ERROR_STATE, FINAL_STATES, TRANSITIONS,
+                     final_state_token_type_map)
+from .tokens import tokens_map, TokenStore
+
+
+class ScanTrace:
+    """
+    Scan steps stored column-wise.
+
+    Chars and states fit in a byte, tokens in progress are interned
+    and referenced by index.
+    """
+
+    def __init__(self):
+        self.numlines = array('i')
+        self.numchars = array('i')
+        self.chars = array('B')
+        self.states = array('B')
+        self.tokens = array('i')
+        self._tokens_table = []
+        self._tokens_index = {}
+
+    def append(self, numline: int, numchar: int, char: str, state: int, token: str):
+        token_index = self._tokens_index.get(token)
+        if token_index is None:
+            token_index = self._tokens_index[token] = len(self._tokens_table)
+            self._tokens_table.append(token)
+        self.numlines.append(numline)
+        self.numchars.append(numchar)
+        self.chars.append(ord(char))
+        self.states.append(state)
+        self.tokens.append(token_index)
+
+    def __len__(self):
+        return len(self.numlines)
+
+    def __iter__(self):
+        """ Yields [numline, numchar, char, state, token] rows. """
+
+        for row in zip(self.numlines, self.numchars, self.chars, self.states, self.tokens):
+            yield [row[0], row[1], chr(row[2]), row[3], self._tokens_table[row[4]]]
 
 
 class Scanner:
-    def __init__(self, input_f):
-        self.scan_tokens = []
+    def __init__(self, input_f, trace: bool=False):
+        self.scan_tokens = TokenStore()
         self.idents_map = {}
         self.constants_map = {}
         self.labels_map = {}
-        self.output = []
+        # scan steps are recorded only on demand, e.g. for the analysis table
+        self.trace = ScanTrace() if trace else None
 
         self.numline = 1
         self.numchar = 1
-        self.current_state = states_map.get(0)
-        self.current_char = ''
+        self.current_state = 0
         self.current_token = ''
+        self._previous_token_repr = None
 
         self.input_file = input_f
 
@@ -24,31 +66,62 @@ class Scanner:
             self.process_line(line)
         return self.scan_tokens
 
-    def get_next_state(self):
-        try:
-            state_index = self.current_state.get_next_state(self.current_char)
-            return states_map.get(state_index)
-        except UnexpectedTokenError:
-            raise PKLLexicalError(f'Unexpected token: {self.current_char}',
-                                  self.numline, self.numchar)
+    def iter_tokens(self):
+        """ Yields tokens line by line as input is read, without keeping them. """
+
+        for line in self.input_file:
+            self.process_line(line)
+            # yielded views keep tokens of their line
+            line_tokens, self.scan_tokens = self.scan_tokens, TokenStore()
+            yield from line_tokens
+
+    @property
+    def output(self):
+        return list(self.trace) if self.trace is not None else []
 
     def process_line(self, line):
-        self.numchar = 0
-        while self.numchar < len(line):
-            self.numchar += 1
-            self.current_char = line[self.numchar - 1]
-            self.current_state = self.get_next_state()
-            if not self.current_state.with_return and not self.current_state.is_initial:
-                self.current_token += self.current_char
-            else:
-                self.numchar -= 1
-            self.write_output()
-            if self.current_state.is_final:
+        # every char of alphabet is ASCII, so char and byte positions match
+        # until the first unexpected char
+        codes = line.encode()
+        transitions = TRANSITIONS
+        trace = self.trace
+        state = self.current_state
+        # token is sliced out of the line when it is completed,
+        # its beginning may come from the previous line
+        prefix = self.current_token
+        start = 0
+        numchar = 0
+        while numchar < len(codes):
+            state = transitions[state][codes[numchar]]
+            if state == ERROR_STATE:
+                raise PKLLexicalError(f'Unexpected token: {line[numchar]}',
+                                      self.numline, numchar + 1)
+            # otherwise the char is processed again from the next state
+            if CONSUMING_STATES[state]:
+                numchar += 1
+
+            if trace is not None:
+                char = line[numchar - 1] if CONSUMING_STATES[state] else line[numchar]
+                trace.append(self.numline, numchar, char, state, prefix + line[start:numchar])
+            if FINAL_STATES[state]:
+                self.current_state = state
+                self.current_token = prefix + line[start:numchar]
+                self.numchar = numchar
                 self.save_token()
-                self.current_token = ''
+                prefix = ''
+                start = numchar
+
+        self.current_state = state
+        self.current_token = prefix + line[start:numchar]
+        self.numchar = numchar
         self.numline += 1
 
     def save_token(self):
+        self._save_token(final_state_token_type_map.get(self.current_state))
+
+    def _save_token(self, token_type: str):
+        """ Saves current token, completed as token of given type: Ident, Const or None. """
+
         if not self.current_token.strip(' '):
             return
         token_repr = self.current_token
@@ -60,10 +133,9 @@ class Scanner:
             token_id = token_obj.id
             token_repr = token_obj.representation
         else:
-            token_type = final_state_token_type_map.get(self.current_state.index)
             if token_type == 'Ident':
-                is_var_declared = self.scan_tokens and self.scan_tokens[-1].token_repr == 'var'
-                is_label_declared = self.scan_tokens and self.scan_tokens[-1].token_repr == 'label'
+                is_var_declared = self._previous_token_repr == 'var'
+                is_label_declared = self._previous_token_repr == 'label'
                 if self.current_token in self.idents_map:
                     if is_var_declared or is_label_declared:
                         raise PKLSemanticError(f'Repeated identifier declaration: {self.current_token}',
@@ -91,18 +163,10 @@ class Scanner:
                 token_id = tokens_map['_CONST'].id
                 ident_const_id = self.constants_map.setdefault(
                     self.current_token, len(self.constants_map))
-        self.scan_tokens.append(ScanToken(
+        self.scan_tokens.append(
             self.numline,
             token_repr,
             token_id,
             ident_const_id
-        ))
-
-    def write_output(self):
-        self.output.append([
-            self.numline,
-            self.numchar,
-            self.current_char,
-            self.current_state.index,
-            self.current_token,
-        ])
+        )
+        self._previous_token_repr = token_repr
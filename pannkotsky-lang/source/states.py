@@ -1,4 +1,4 @@
-from . import helpers
+from .alphabet import ALPHABET, DIGITS, LETTERS
 
 
 class UnexpectedTokenError(Exception):
@@ -18,7 +18,7 @@ class State:
 
     @classmethod
     def get_next_state(cls, c):
-        if not helpers.is_symbol(c):
+        if c not in ALPHABET:
             raise UnexpectedTokenError
         if c in cls.transitions_map:
             return cls.transitions_map[c]
@@ -69,9 +69,9 @@ class State0(State):
 
     @classmethod
     def _get_next_state(cls, c):
-        if helpers.is_letter(c):
+        if c in LETTERS:
             return 1
-        if helpers.is_digit(c):
+        if c in DIGITS:
             return 2
 
 
@@ -81,7 +81,7 @@ class State1(State):
 
     @classmethod
     def _get_next_state(cls, c):
-        if helpers.is_digit(c) or helpers.is_letter(c):
+        if c in DIGITS or c in LETTERS:
             return 1
         return 16
 
@@ -92,9 +92,9 @@ class State2(State):
 
     @classmethod
     def _get_next_state(cls, c):
-        if helpers.is_digit(c):
+        if c in DIGITS:
             return 2
-        if helpers.is_letter(c):
+        if c in LETTERS:
             raise UnexpectedTokenError
         return 17
 
@@ -286,3 +286,32 @@ final_state_token_type_map = {
     16: 'Ident',
     17: 'Const',
 }
+
+
+def _compile_transitions():
+    """
+    Builds dense transitions table out of state classes:
+    table[state][char code] is the next state index or ERROR_STATE.
+    Every row covers all byte values, non-ASCII ones are never allowed.
+    """
+
+    table = []
+    for index in range(len(states_map)):
+        row = bytearray([ERROR_STATE]) * 256
+        for code in range(128):
+            try:
+                row[code] = states_map[index].get_next_state(chr(code))
+            except UnexpectedTokenError:
+                pass
+        table.append(bytes(row))
+    return table
+
+
+ERROR_STATE = 255
+TRANSITIONS = _compile_transitions()
+FINAL_STATES = [states_map[index].is_final for index in range(len(states_map))]
+# states in which current char becomes part of the token, otherwise it is processed again
+CONSUMING_STATES = [
+    not states_map[index].with_return and not states_map[index].is_initial
+    for index in range(len(states_map))
+]
@@ -1,174 +1,263 @@
-from typing import Iterable, List
+from typing import FrozenSet, Iterable, List, NamedTuple, Optional, Union
 
 from .errors import PKLSyntaxError
-from .tokens import ScanToken
-
-ScanTokens = List[ScanToken]
+from .tokens import ProgramTokens, ScanToken, TokenStore, tokens_id_map, tokens_map
 
 
 class NotEnoughTokens(Exception):
     pass
 
 
+class Expected(NamedTuple):
+    """ Ids of tokens expected by a check and the tokens shown in its error message. """
+
+    ids: FrozenSet[int]
+    tokens: List[str]
+
+
+def _expected(*tokens: str) -> Expected:
+    return Expected(frozenset(tokens_map[token].id for token in tokens), list(tokens))
+
+
+SEPARATOR = _expected('\n')
+VAR = _expected('var')
+IDENT = _expected('_IDENT')
+ASSIGNMENT = _expected(':=')
+OPENING_BRACKET = _expected('(')
+CLOSING_BRACKET = _expected(')')
+OPERAND = _expected('_IDENT', '_CONST', 'input')
+OPERATION = _expected('+', '-', '*', '/', '^')
+REPEAT = _expected('repeat')
+UNTIL = _expected('until')
+LOGICAL_OPERATION = _expected('<', '>', '<=', '>=', '==', '!=')
+IF = _expected('if')
+GOTO = _expected('goto')
+LABEL = _expected('label')
+LABEL_NAME = _expected('_LABEL')
+PRINT = _expected('print')
+
+
 class SyntaxAnalyzer:
-    def __init__(self, tokens: ScanTokens):
-        self._input_tokens = tokens
+    """
+    Recursive descent analyzer.
+
+    Every rule gets the position of its first token in the input tokens
+    and returns the amount of tokens it has processed.
+    Input tokens are a TokenStore, whose columns are read directly, or any
+    iterable of ScanToken, e.g. scanner generator: those are read as rules
+    need them and released by top-level statements.
+    """
+
+    def __init__(self, tokens: Union[TokenStore, Iterable[ScanToken]]):
+        if isinstance(tokens, TokenStore):
+            self._store = tokens
+            self._input_tokens = None
+            self._owns_store = False
+        else:
+            self._store = TokenStore()
+            self._input_tokens = iter(tokens)
+            self._owns_store = True
+        # position of the first token in the store, tokens read from the input
+        # are dropped from it when they are released
+        self._offset = 0
+        self._released = 0
+        # FIRST sets of statements: the rule is chosen by its first token
+        self._statement_rules = {}
+        for expected, rule in [
+            (VAR, self.assignment),
+            (IDENT, self.assignment),
+            (REPEAT, self.loop),
+            (IF, self.condition),
+            (GOTO, self.goto),
+            (LABEL, self.label),
+            (PRINT, self.output),
+        ]:
+            self._statement_rules.update(dict.fromkeys(expected.ids, rule))
 
     def run(self):
-        tokens = self._input_tokens
+        tokens = ProgramTokens()
+        for statement in self.iter_statements():
+            tokens.extend(statement)
         # no tokens is a valid program
         if not tokens:
             return
+        return tokens
+
+    def iter_statements(self):
+        """
+        Yields program tokens of every top-level statement as soon as it is checked.
+
+        Program is a sequence of blocks, and top-level blocks are sequences of
+        statements, so the program is checked statement by statement.
+        """
+
         total_processed = 0
-        while total_processed < len(tokens):
+        while self._get_token(total_processed) is not None:
             try:
-                total_processed += self.block(tokens[total_processed:])
+                total_processed += self.statement(total_processed)
             except NotEnoughTokens:
-                raise PKLSyntaxError('Unexpected end of program', tokens[-1].numline)
-        return [token.token_repr for token in tokens]
+                raise PKLSyntaxError('Unexpected end of program', self._store.numlines[-1])
+            yield self._release(total_processed)
 
-    def check_token(self, tokens: ScanTokens, expected: Iterable[str]):
-        if not tokens:
+    def _get_token(self, position: int):
+        """
+        Returns index of the token at the position in the store, reading input
+        as needed, or None at the end.
+        """
+
+        index = position - self._offset
+        store = self._store
+        while index >= len(store):
+            if self._input_tokens is None:
+                return None
+            token = next(self._input_tokens, None)
+            if token is None:
+                self._input_tokens = None
+                return None
+            store.append(token.numline, token.token_repr, token.token_id, token.ident_id)
+        return index
+
+    def _release(self, position: int) -> ProgramTokens:
+        """ Returns program tokens from the previous release to the position. """
+
+        store = self._store
+        released = store.program_tokens(self._released - self._offset, position - self._offset)
+        self._released = position
+        if self._owns_store:
+            store.delete(position - self._offset)
+            self._offset = position
+        return released
+
+    def _token_id(self, position: int) -> Optional[int]:
+        """ Returns id of the token at the position or None at the end. """
+
+        index = self._get_token(position)
+        return None if index is None else self._store.token_ids[index]
+
+    def _is_token(self, position: int, expected: Expected) -> bool:
+        return self._token_id(position) in expected.ids
+
+    def check_token(self, position: int, expected: Expected):
+        index = self._get_token(position)
+        if index is None:
             raise NotEnoughTokens
 
-        token_str = tokens[0].get_token_str()
-        if token_str not in expected:
-            raise PKLSyntaxError(f'{expected} expected, got {token_str}', tokens[0].numline)
+        token_id = self._store.token_ids[index]
+        if token_id not in expected.ids:
+            raise PKLSyntaxError(f'{expected.tokens} expected, got {tokens_id_map[token_id].token}',
+                                 self._store.numlines[index])
         return 1
 
-    def block(self, tokens: ScanTokens) -> int:
-        total_processed = self.statement(tokens)
-        while total_processed < len(tokens):
-            # empty line separates block
-            try:
-                self.separator(tokens[total_processed:])
-            except PKLSyntaxError:
-                pass
-            else:
+    def block(self, position: int) -> int:
+        total_processed = self.statement(position)
+        while True:
+            token_id = self._token_id(position + total_processed)
+            if token_id is None:
+                break
+            # empty line separates block, it ends the statement containing the block
+            if token_id in SEPARATOR.ids:
                 return total_processed
             try:
-                total_processed += self.statement(tokens[total_processed:])
+                total_processed += self.statement(position + total_processed)
             except PKLSyntaxError:
                 break
         return total_processed
 
-    def statement(self, tokens: ScanTokens) -> int:
-        for method in [
-            self.assignment,
-            self.loop,
-            self.condition,
-            self.goto,
-            self.label,
-            self.output
-        ]:
-            total_processed = method(tokens)
-            if total_processed > 0:
-                break
-        total_processed += self.separator(tokens[total_processed:])
+    def statement(self, position: int) -> int:
+        total_processed = 0
+        rule = self._statement_rules.get(self._token_id(position))
+        if rule is not None:
+            total_processed = rule(position)
+        total_processed += self.separator(position + total_processed)
         return total_processed
 
-    def separator(self, tokens: ScanTokens) -> int:
-        return self.check_token(tokens, ['\n'])
+    def separator(self, position: int) -> int:
+        return self.check_token(position, SEPARATOR)
 
-    def assignment(self, tokens: ScanTokens) -> int:
+    def assignment(self, position: int) -> int:
         total_processed = 0
-        var_found = False
-        try:
-            total_processed += self.check_token(tokens[total_processed:], ['var'])
-        except (PKLSyntaxError, NotEnoughTokens):
-            pass
-        else:
-            var_found = True
-        try:
-            total_processed += self.check_token(tokens[total_processed:], ['_IDENT'])
-        except (PKLSyntaxError, NotEnoughTokens):
-            if var_found:
-                raise
+        var_found = self._is_token(position, VAR)
+        if var_found:
+            total_processed += 1
+        if not var_found and not self._is_token(position, IDENT):
             return total_processed
-        total_processed += self.check_token(tokens[total_processed:], [':='])
-        total_processed += self.expression(tokens[total_processed:])
+        total_processed += self.check_token(position + total_processed, IDENT)
+        total_processed += self.check_token(position + total_processed, ASSIGNMENT)
+        total_processed += self.expression(position + total_processed)
         return total_processed
 
-    def expression(self, tokens: ScanTokens) -> int:
+    def expression(self, position: int) -> int:
         total_processed = 0
-        try:
-            total_processed += self.check_token(tokens, ['('])
-        except PKLSyntaxError:
-            total_processed += self.operand(tokens[total_processed:])
+        if self._is_token(position, OPENING_BRACKET):
+            total_processed += 1
+            total_processed += self.expression(position + total_processed)
+            total_processed += self.check_token(position + total_processed, CLOSING_BRACKET)
         else:
-            total_processed += self.expression(tokens[total_processed:])
-            total_processed += self.check_token(tokens[total_processed:], [')'])
+            total_processed += self.operand(position + total_processed)
 
-        try:
-            total_processed += self.operation(tokens[total_processed:])
-        except (PKLSyntaxError, NotEnoughTokens):
+        if not self._is_token(position + total_processed, OPERATION):
             return total_processed
-
-        total_processed += self.expression(tokens[total_processed:])
+        total_processed += 1
+        total_processed += self.expression(position + total_processed)
         return total_processed
 
-    def operand(self, tokens: ScanTokens) -> int:
-        return self.check_token(tokens, ['_IDENT', '_CONST', 'input'])
+    def operand(self, position: int) -> int:
+        return self.check_token(position, OPERAND)
 
-    def operation(self, tokens: ScanTokens) -> int:
-        return self.check_token(tokens, ['+', '-', '*', '/', '^'])
+    def operation(self, position: int) -> int:
+        return self.check_token(position, OPERATION)
 
-    def loop(self, tokens: ScanTokens) -> int:
+    def loop(self, position: int) -> int:
         total_processed = 0
-        try:
-            total_processed += self.check_token(tokens[total_processed:], ['repeat'])
-        except (PKLSyntaxError, NotEnoughTokens):
+        if not self._is_token(position, REPEAT):
             return total_processed
-        total_processed += self.separator(tokens[total_processed:])
-        total_processed += self.block(tokens[total_processed:])
-        total_processed += self.check_token(tokens[total_processed:], ['until'])
-        total_processed += self.logical_expression(tokens[total_processed:])
+        total_processed += 1
+        total_processed += self.separator(position + total_processed)
+        total_processed += self.block(position + total_processed)
+        total_processed += self.check_token(position + total_processed, UNTIL)
+        total_processed += self.logical_expression(position + total_processed)
         return total_processed
 
-    def logical_expression(self, tokens: ScanTokens) -> int:
+    def logical_expression(self, position: int) -> int:
         total_processed = 0
-        total_processed += self.expression(tokens[total_processed:])
-        total_processed += self.logical_operation(tokens[total_processed:])
-        total_processed += self.expression(tokens[total_processed:])
+        total_processed += self.expression(position + total_processed)
+        total_processed += self.logical_operation(position + total_processed)
+        total_processed += self.expression(position + total_processed)
         return total_processed
 
-    def logical_operation(self, tokens: ScanTokens) -> int:
-        return self.check_token(tokens, ['<', '>', '<=', '>=', '==', '!='])
+    def logical_operation(self, position: int) -> int:
+        return self.check_token(position, LOGICAL_OPERATION)
 
-    def condition(self, tokens: ScanTokens) -> int:
+    def condition(self, position: int) -> int:
         total_processed = 0
-        try:
-            total_processed += self.check_token(tokens[total_processed:], ['if'])
-        except (PKLSyntaxError, NotEnoughTokens):
+        if not self._is_token(position, IF):
             return total_processed
-        total_processed += self.logical_expression(tokens[total_processed:])
-        total_processed += self.separator(tokens[total_processed:])
-        total_processed += self.block(tokens[total_processed:])
+        total_processed += 1
+        total_processed += self.logical_expression(position + total_processed)
+        total_processed += self.separator(position + total_processed)
+        total_processed += self.block(position + total_processed)
         return total_processed
 
-    def goto(self, tokens: ScanTokens) -> int:
+    def goto(self, position: int) -> int:
         total_processed = 0
-        try:
-            total_processed += self.check_token(tokens[total_processed:], ['goto'])
-        except (PKLSyntaxError, NotEnoughTokens):
+        if not self._is_token(position, GOTO):
             return total_processed
-        total_processed += self.check_token(tokens[total_processed:], ['_LABEL'])
+        total_processed += 1
+        total_processed += self.check_token(position + total_processed, LABEL_NAME)
         return total_processed
 
-    def label(self, tokens: ScanTokens) -> int:
+    def label(self, position: int) -> int:
         total_processed = 0
-        try:
-            total_processed += self.check_token(tokens[total_processed:], ['label'])
-        except (PKLSyntaxError, NotEnoughTokens):
+        if not self._is_token(position, LABEL):
             return total_processed
-        total_processed += self.check_token(tokens[total_processed:], ['_LABEL'])
+        total_processed += 1
+        total_processed += self.check_token(position + total_processed, LABEL_NAME)
         return total_processed
 
-    def output(self, tokens: ScanTokens) -> int:
+    def output(self, position: int) -> int:
         total_processed = 0
-        try:
-            total_processed += self.check_token(tokens[total_processed:], ['print'])
-        except (PKLSyntaxError, NotEnoughTokens):
+        if not self._is_token(position, PRINT):
             return total_processed
-        total_processed += self.expression(tokens[total_processed:])
+        total_processed += 1
+        total_processed += self.expression(position + total_processed)
         return total_processed
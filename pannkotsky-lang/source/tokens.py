@@ -1,3 +1,7 @@
+from array import array
+from typing import List
+
+
 class Token:
     def __init__(self, id: int, token: str, description: str, representation: str=None):
         self.id = id
@@ -46,12 +50,110 @@ for index, args in enumerate(tokens):
     tokens_map[args[0]] = token
 
 
+# ident/const id column value of tokens which are neither idents nor constants
+_NO_IDENT_ID = -1
+
+
+class TokenStore:
+    """
+    Scan tokens stored column-wise.
+
+    Line, token id and ident/const id of every token are int arrays,
+    token representations are interned and referenced by index.
+    Tokens are read through ScanToken views or directly from the columns.
+    """
+
+    def __init__(self):
+        self.numlines = array('i')
+        self.token_ids = array('i')
+        self.ident_ids = array('i')
+        self.reprs = array('i')
+        self.strings = []
+        self._strings_index = {}
+
+    def append(self, numline: int, token_repr: str, token_id: int, ident_id):
+        repr_index = self._strings_index.get(token_repr)
+        if repr_index is None:
+            repr_index = self._strings_index[token_repr] = len(self.strings)
+            self.strings.append(token_repr)
+        self.numlines.append(numline)
+        self.token_ids.append(token_id)
+        self.ident_ids.append(_NO_IDENT_ID if ident_id == '' else ident_id)
+        self.reprs.append(repr_index)
+
+    def delete(self, count: int):
+        """ Drops the first count tokens, the rest are shifted to the start. """
+
+        for column in (self.numlines, self.token_ids, self.ident_ids, self.reprs):
+            del column[:count]
+
+    def token_repr(self, index: int) -> str:
+        return self.strings[self.reprs[index]]
+
+    def ident_id(self, index: int):
+        ident_id = self.ident_ids[index]
+        return '' if ident_id == _NO_IDENT_ID else ident_id
+
+    def program_token(self, index: int) -> 'ProgramToken':
+        return ProgramToken(self.token_repr(index), self.token_ids[index],
+                            self.ident_id(index), self.numlines[index])
+
+    def program_tokens(self, start: int, end: int) -> 'ProgramTokens':
+        """ Tokens from start to end as program tokens, columns are copied, not the strings. """
+
+        strings = self.strings
+        return ProgramTokens([strings[index] for index in self.reprs[start:end]],
+                             self.token_ids[start:end], self.ident_ids[start:end],
+                             self.numlines[start:end])
+
+    def rows(self):
+        """ Yields (numline, token_repr, token_id, ident_id) of every token. """
+
+        strings = self.strings
+        for numline, repr_index, token_id, ident_id in zip(
+                self.numlines, self.reprs, self.token_ids, self.ident_ids):
+            yield (numline, strings[repr_index], token_id,
+                   '' if ident_id == _NO_IDENT_ID else ident_id)
+
+    def __len__(self):
+        return len(self.numlines)
+
+    def __getitem__(self, index: int) -> 'ScanToken':
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('Token index out of range')
+        return ScanToken(self, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield ScanToken(self, index)
+
+
 class ScanToken:
-    def __init__(self, numline: int, token_repr: str, token_id: int, ident_id: int):
-        self.numline = numline
-        self.token_repr = token_repr
-        self.token_id = token_id
-        self.ident_id = ident_id
+    """ View of a token of TokenStore. """
+
+    __slots__ = ('store', 'index')
+
+    def __init__(self, store: TokenStore, index: int):
+        self.store = store
+        self.index = index
+
+    @property
+    def numline(self) -> int:
+        return self.store.numlines[self.index]
+
+    @property
+    def token_repr(self) -> str:
+        return self.store.token_repr(self.index)
+
+    @property
+    def token_id(self) -> int:
+        return self.store.token_ids[self.index]
+
+    @property
+    def ident_id(self):
+        return self.store.ident_id(self.index)
 
     def to_table_row(self):
         return (
@@ -67,5 +169,52 @@ class ScanToken:
     def get_token_str(self) -> str:
         return self.get_token_object().token
 
+    def to_program_token(self) -> 'ProgramToken':
+        return self.store.program_token(self.index)
+
     def __str__(self):
         return self.token_repr
+
+
+class ProgramToken(str):
+    """
+    Token representation which keeps token id and ident/const id assigned by scanner
+    and the source line of the token.
+    """
+
+    __slots__ = ('token_id', 'ident_id', 'numline')
+
+    def __new__(cls, token_repr: str, token_id: int, ident_id: int, numline: int = None):
+        program_token = super().__new__(cls, token_repr)
+        program_token.token_id = token_id
+        program_token.ident_id = ident_id
+        program_token.numline = numline
+        return program_token
+
+
+class ProgramTokens(list):
+    """
+    Program tokens column-wise, as released by SyntaxAnalyzer.
+
+    The list holds token representations shared with the scanner, token id,
+    ident/const id and line of every token are int arrays of the same length.
+    ProgramToken of a token is made on demand.
+    """
+
+    def __init__(self, token_reprs: List[str] = (), token_ids: array = None,
+                 ident_ids: array = None, numlines: array = None):
+        super().__init__(token_reprs)
+        self.token_ids = array('i') if token_ids is None else token_ids
+        self.ident_ids = array('i') if ident_ids is None else ident_ids
+        self.numlines = array('i') if numlines is None else numlines
+
+    def extend(self, tokens: 'ProgramTokens'):
+        super().extend(tokens)
+        self.token_ids.extend(tokens.token_ids)
+        self.ident_ids.extend(tokens.ident_ids)
+        self.numlines.extend(tokens.numlines)
+
+    def program_token(self, index: int) -> ProgramToken:
+        ident_id = self.ident_ids[index]
+        return ProgramToken(self[index], self.token_ids[index],
+                            '' if ident_id == _NO_IDENT_ID else ident_id, self.numlines[index])
@@ -0,0 +1,207 @@
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional
+
+from .batch import execute_vector, run_batch
+from .bytecode import DECLARE, INCREMENT, LOAD_CONST, LOAD_VAR, OPCODES, STORE, Program
+
+try:
+    import numpy as np
+except ImportError:
+    # vectorized execution is optional, programs run on Executor without it
+    np = None
+
+# vectors evaluated at once, arrays of a chunk take a few MB per input and print
+VECTOR_CHUNK_SIZE = 1 << 16
+
+_ADD = OPCODES['+']
+_SUBTRACT = OPCODES['-']
+_MULTIPLY = OPCODES['*']
+_DIVIDE = OPCODES['/']
+_POWER = OPCODES['^']
+_PRINT = OPCODES['print']
+_INPUT = OPCODES['input']
+
+_VECTORIZED_OPCODES = {LOAD_CONST, LOAD_VAR, STORE, DECLARE, INCREMENT,
+                       _ADD, _SUBTRACT, _MULTIPLY, _DIVIDE, _POWER, _PRINT, _INPUT}
+
+
+class _NotVectorizable(Exception):
+    pass
+
+
+def is_vectorizable(program: Program) -> bool:
+    """ Checks if program has no control flow and only does integer arithmetic. """
+
+    return np is not None and all(opcode in _VECTORIZED_OPCODES for opcode, _ in program.code)
+
+
+# Checked int64 operations return result and mask of elements where it differs
+# from the one of python ints, those are executed by Executor.
+
+def _add(a, b):
+    result = a + b
+    return result, ((a ^ result) & (b ^ result)) < 0
+
+
+def _subtract(a, b):
+    result = a - b
+    return result, ((a ^ b) & (a ^ result)) < 0
+
+
+def _multiply(a, b):
+    result = a * b
+    # wrapped result differs from the exact one by a multiple of 2 ** 64, except for -1 * min
+    exact = result // np.where(a == 0, 1, a) == b
+    return result, ((a != 0) & ~exact) | ((a == -1) & (b == np.iinfo(np.int64).min))
+
+
+def _divide(a, b):
+    # division by zero raises, min // -1 does not fit
+    invalid = (b == 0) | ((a == np.iinfo(np.int64).min) & (b == -1))
+    return a // np.where(invalid, 1, b), invalid
+
+
+def _power(value, power):
+    # negative power gives float, power is computed by squaring to check every product
+    invalid = power < 0
+    result = np.ones_like(value)
+    base = value
+    power = np.where(invalid, 0, power)
+    while np.any(power > 0):
+        odd = (power & 1) == 1
+        product, overflow = _multiply(result, base)
+        result = np.where(odd, product, result)
+        invalid = invalid | (odd & overflow)
+        power = power >> 1
+        base, overflow = _multiply(base, base)
+        invalid = invalid | ((power > 0) & overflow)
+    return result, invalid
+
+
+_OPERATIONS = {
+    _ADD: _add,
+    _SUBTRACT: _subtract,
+    _MULTIPLY: _multiply,
+    _DIVIDE: _divide,
+    _POWER: _power,
+}
+
+
+def _evaluate(program: Program, columns, invalid) -> list:
+    """
+    Executes program once over input columns, returns printed columns.
+
+    Elements whose results would differ from python ints are marked in invalid.
+    """
+
+    code = program.code
+    constants = {index: np.int64(value) for index, value in enumerate(program.constants)
+                 if value is not None}
+    variables = [None] * len(program.names)
+    stack = []
+    printed = []
+    inputs = iter(columns)
+
+    for opcode, arg in code:
+        if opcode == LOAD_CONST:
+            stack.append(constants[arg])
+        elif opcode == LOAD_VAR:
+            if variables[arg] is None:
+                # executor fails on undefined values
+                raise _NotVectorizable
+            stack.append(variables[arg])
+        elif opcode == STORE:
+            variables[arg] = stack.pop()
+        elif opcode == DECLARE:
+            variables[arg] = None
+        elif opcode == INCREMENT:
+            slot, value = arg
+            if variables[slot] is None:
+                raise _NotVectorizable
+            variables[slot], overflow = _add(variables[slot], np.int64(value))
+            invalid |= overflow
+        elif opcode == _INPUT:
+            stack.append(next(inputs))
+        elif opcode == _PRINT:
+            printed.append(np.broadcast_to(stack.pop(), invalid.shape))
+        else:
+            b = stack.pop()
+            a = stack.pop()
+            result, overflow = _OPERATIONS[opcode](a, b)
+            stack.append(result)
+            invalid |= overflow
+    return printed
+
+
+def inputs_count(program: Program) -> int:
+    return sum(opcode == _INPUT for opcode, _ in program.code)
+
+
+def evaluate_columns(program: Program, columns: "np.ndarray"):
+    """
+    Executes vectorizable program once over int64 matrix with a column for every input.
+
+    Returns matrix with a column for every print and mask of rows whose results
+    differ from the ones of python ints, those should be executed by Executor.
+    Raises OverflowError if constants do not fit int64 and ValueError if program
+    reads undefined variable.
+    """
+
+    invalid = np.zeros(len(columns), dtype=bool)
+    try:
+        with np.errstate(all='ignore'):
+            printed = _evaluate(program, list(columns.T), invalid)
+    except _NotVectorizable:
+        raise ValueError('Program reads undefined variable')
+    if not printed:
+        return np.empty((len(columns), 0), dtype=np.int64), invalid
+    return np.stack(printed, axis=1), invalid
+
+
+def execute_vectorized(program: Program, vectors: List[List[int]]) -> List[tuple]:
+    """
+    Executes vectorizable program for every input vector over int64 arrays.
+
+    Returns (inputs, output, error) for every vector. Vectors whose results
+    would differ from python ints, e.g. on overflow or division by zero,
+    and those with too few inputs are executed by Executor.
+    """
+
+    count = inputs_count(program)
+    too_short = [len(inputs) < count for inputs in vectors]
+    try:
+        columns = np.array([[0] * count if short else inputs[:count]
+                            for inputs, short in zip(vectors, too_short)],
+                           dtype=np.int64).reshape(len(vectors), count)
+        printed, invalid = evaluate_columns(program, columns)
+    except (OverflowError, ValueError):
+        # inputs or constants do not fit int64, or program reads undefined variable
+        return [(inputs, *execute_vector(program, inputs)) for inputs in vectors]
+
+    invalid |= too_short
+    return [
+        (inputs, *execute_vector(program, inputs)) if is_invalid else (inputs, output, None)
+        for inputs, output, is_invalid in zip(vectors, printed.tolist(), invalid.tolist())
+    ]
+
+
+def run_vectorized(program: Program, vectors: Iterable[List[int]], workers: Optional[int] = None,
+                   max_steps: Optional[int] = None,
+                   chunk_size: int = VECTOR_CHUNK_SIZE) -> Iterator[tuple]:
+    """
+    Executes program for every input vector like run_batch does, evaluating
+    chunks of vectors at once when program is branch-free arithmetic.
+    Other programs are executed by run_batch.
+    """
+
+    if not is_vectorizable(program):
+        yield from run_batch(program, vectors, workers, max_steps)
+        return
+
+    # steps budget does not apply, program without jumps takes as many steps as it has instructions
+    vectors = iter(vectors)
+    while True:
+        chunk = list(islice(vectors, chunk_size))
+        if not chunk:
+            break
+        yield from execute_vectorized(program, chunk)
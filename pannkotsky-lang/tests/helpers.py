@@ -1,6 +1,21 @@
+import glob
+import os
+import random
 import sys
 from contextlib import contextmanager
 from io import StringIO
+from typing import Iterable, List, Tuple
+from unittest import TestCase, mock
+
+from source.exec import Executor
+from source.rpn import RPNBuilder
+from source.scan import Scanner
+from source.syntax import SyntaxAnalyzer
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'examples')
+
+VARIABLES = ['a', 'b', 'c']
+COMPARISONS = ['<', '>', '<=', '>=', '==', '!=']
 
 
 @contextmanager
@@ -12,3 +27,87 @@ def captured_output():
         yield sys.stdout, sys.stderr
     finally:
         sys.stdout, sys.stderr = old_out, old_err
+
+
+def example_programs() -> List[Tuple[str, str]]:
+    """ Path and source of every example program. """
+
+    programs = []
+    for path in sorted(glob.glob(os.path.join(EXAMPLES_DIR, '*.pkl'))):
+        with open(path) as f:
+            programs.append((path, f.read()))
+    return programs
+
+
+def build_rpn(program: str):
+    return RPNBuilder(SyntaxAnalyzer(Scanner(StringIO(program)).scan()).run()).build()
+
+
+def execute(executor, inputs: Iterable[str] = ()):
+    """ Output of executor, which is given inputs when it asks for them, or class of its error. """
+
+    with mock.patch('builtins.input', side_effect=list(inputs)):
+        try:
+            return executor.execute()
+        except Exception as e:
+            return e.__class__
+
+
+class ExecutorComparisonTestCase(TestCase):
+    def assertSameAsExecutor(self, program, executor, inputs: Iterable[str] = ()):
+        """ Executor of the program and the given one have the same output or error. """
+
+        self.assertEqual(execute(executor, inputs), execute(Executor(program), inputs))
+
+
+def random_expression(rng: random.Random, depth: int = 2) -> str:
+    if depth == 0 or rng.random() < 0.3:
+        return rng.choice(VARIABLES + [str(rng.randint(0, 9))])
+    operator = rng.choice(['+', '-', '*', '/', '^'])
+    if operator == '^':
+        # powers of variables would grow too fast in loops
+        return f'{rng.randint(0, 9)} ^ {rng.randint(0, 3)}'
+    return f'({random_expression(rng, depth - 1)}) {operator} {random_expression(rng, depth - 1)}'
+
+
+def random_statements(rng: random.Random, depth: int, counters: list) -> list:
+    lines = []
+    for _ in range(rng.randint(1, 4)):
+        kind = rng.random()
+        if kind < 0.35:
+            lines.append(f'{rng.choice(VARIABLES)} := {random_expression(rng)}')
+        elif kind < 0.6 or depth == 0:
+            lines.append(f'print {random_expression(rng)}')
+        elif kind < 0.8:
+            lines.append(f'if {random_expression(rng, 1)} {rng.choice(COMPARISONS)} '
+                         f'{random_expression(rng, 1)}')
+            lines += random_statements(rng, depth - 1, counters)
+            lines.append('')
+        else:
+            # loops are bounded by counters nothing else assigns
+            counter = f'k{len(counters)}'
+            counters.append(counter)
+            lines.append(f'{counter} := 0')
+            if kind < 0.9:
+                lines.append('repeat')
+                lines.append(f'{counter} := {counter} + 1')
+                lines += random_statements(rng, depth - 1, counters)
+                lines.append(f'until {counter} > {rng.randint(0, 2)}')
+            else:
+                lines.append(f'label l{counter}')
+                lines += random_statements(rng, depth - 1, counters)
+                lines.append(f'if {counter} < {rng.randint(0, 3)}')
+                lines.append(f'{counter} := {counter} + 1')
+                lines.append(f'goto l{counter}')
+                lines.append('')
+    return lines
+
+
+def random_program(seed: int) -> str:
+    """ Program of random statements, loops and 'if' blocks, the same for the same seed. """
+
+    rng = random.Random(seed)
+    counters = []
+    body = random_statements(rng, 2, counters)
+    header = [f'var {name} := {rng.randint(0, 9)}' for name in VARIABLES + counters]
+    return '\n'.join(header + body) + '\n'
@@ -0,0 +1,48 @@
+from io import StringIO
+from unittest import TestCase
+
+from source.batch import read_input_vectors, run_batch
+from source.bytecode import compile_rpn
+
+# print a / b for a := input, b := input
+TOKENS = 'a var input := b var input := a b / print'.split()
+
+
+class ReadInputVectorsTestCase(TestCase):
+    def test_csv(self):
+        vectors = read_input_vectors(StringIO('1,2\n\n-3, 4\n5\n'))
+        self.assertEqual(list(vectors), [[1, 2], [-3, 4], [5]])
+
+    def test_json_lines(self):
+        vectors = read_input_vectors(StringIO('[1, 2]\n[]\n'))
+        self.assertEqual(list(vectors), [[1, 2], []])
+
+    def test_invalid_vector(self):
+        with self.assertRaises(ValueError):
+            list(read_input_vectors(StringIO('[1, 2]\n["a"]\n')))
+        with self.assertRaises(ValueError):
+            list(read_input_vectors(StringIO('1,a\n')))
+
+
+class RunBatchTestCase(TestCase):
+    vectors = [[7, 2], [1, 0], [5], [9, 3]]
+    expected = [
+        ([7, 2], [3], None),
+        ([1, 0], None, 'ZeroDivisionError: integer division or modulo by zero'),
+        ([5], None, 'PKLRuntimeError: No more input values'),
+        ([9, 3], [3], None),
+    ]
+
+    def test_single_worker(self):
+        results = list(run_batch(compile_rpn(TOKENS), self.vectors, workers=1))
+        self.assertEqual(results, self.expected)
+
+    def test_worker_pool_keeps_order(self):
+        results = run_batch(compile_rpn(TOKENS), self.vectors * 10, workers=2, chunk_size=3)
+        self.assertEqual(list(results), self.expected * 10)
+
+    def test_step_limit(self):
+        program = compile_rpn('1 print 0 goto'.split())
+        (_, output, error), = run_batch(program, [[]], workers=1, max_steps=10)
+        self.assertIsNone(output)
+        self.assertIn('Step limit', error)
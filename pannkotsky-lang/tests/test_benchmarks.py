@@ -0,0 +1,42 @@
+from io import StringIO
+from unittest import TestCase
+
+from benchmarks.suite import benchmark_program, compare_results, generate_program
+from source.pipeline import run_source
+
+PHASES = ['scan', 'syntax', 'rpn', 'compile', 'execute']
+
+
+def results(seconds, peak_memory):
+    return {
+        'version': 1,
+        'cases': {'case': {'params': {}, 'phases': {'scan': {'seconds': seconds,
+                                                             'peak_memory': peak_memory}}}},
+    }
+
+
+class BenchmarkSuiteTestCase(TestCase):
+    def test_generated_programs_run(self):
+        for depth in range(4):
+            with self.subTest(depth=depth):
+                source = generate_program(200, depth, loop_iterations=3, seed=depth)
+                self.assertEqual(source, generate_program(200, depth, 3, seed=depth))
+                self.assertGreaterEqual(source.count('\n'), 200)
+                run_source(StringIO(source))
+
+    def test_benchmark_program(self):
+        phases = benchmark_program(generate_program(50), repeat=1)
+        self.assertEqual(list(phases), PHASES)
+        for result in phases.values():
+            self.assertGreater(result['seconds'], 0)
+            self.assertGreater(result['peak_memory'], 0)
+
+    def test_compare(self):
+        baseline = results(1.0, 1000)
+        self.assertFalse(compare_results(baseline, results(1.05, 1000))[0]['regression'])
+        self.assertTrue(compare_results(baseline, results(1.2, 1000))[0]['regression'])
+        self.assertTrue(compare_results(baseline, results(1.0, 1200))[0]['regression'])
+        rows = compare_results(baseline, results(1.2, 1000), threshold=0.5)
+        self.assertFalse(rows[0]['regression'])
+        with self.assertRaises(ValueError):
+            compare_results(baseline, {**results(1.0, 1000), 'version': 2})
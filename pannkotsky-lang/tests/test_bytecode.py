@@ -0,0 +1,114 @@
+from unittest import TestCase
+
+from source.bytecode import (COMPARE_JUMP_IF_NOT, DECLARE, INCREMENT, JUMP, JUMP_IF_NOT,
+                             LOAD_CONST, LOAD_VAR, OPCODES, STORE, compile_rpn,
+                             peephole)
+from source.tokens import ProgramToken, tokens_map
+
+
+class CompileTestCase(TestCase):
+    def test_compile(self):
+        tokens = 'a var 12 := a 12 + print'.split()
+        program = compile_rpn(tokens)
+        self.assertEqual(program.code, [
+            (DECLARE, 0),
+            (LOAD_CONST, 0),
+            (STORE, 0),
+            (LOAD_VAR, 0),
+            (LOAD_CONST, 0),
+            (OPCODES['+'], 2),
+            (OPCODES['print'], 1),
+        ])
+        self.assertEqual(program.constants, [12])
+        self.assertEqual(program.names, ['a'])
+
+    def test_scanner_ids(self):
+        ident_id = tokens_map['_IDENT'].id
+        const_id = tokens_map['_CONST'].id
+        tokens = [
+            ProgramToken('b', ident_id, 1),
+            ProgramToken('7', const_id, 2),
+            ProgramToken(':=', tokens_map[':='].id, ''),
+        ]
+        program = compile_rpn(tokens)
+        self.assertEqual(program.code, [(LOAD_CONST, 2), (STORE, 1)])
+        self.assertEqual(program.names[1], 'b')
+        self.assertEqual(program.constants[2], 7)
+
+    def test_jump_targets_are_remapped(self):
+        tokens = 'a 1 > 6 goto_if_not a print 0 goto'.split()
+        program = compile_rpn(tokens, superinstructions=False)
+        self.assertEqual(program.code[3], (JUMP_IF_NOT, 5))
+        self.assertEqual(program.code[6], (JUMP, 0))
+        self.assertEqual(len(program), 7)
+
+    def test_jump_past_the_end(self):
+        tokens = 'a 1 > 100 goto_if_not a print'.split()
+        program = compile_rpn(tokens, superinstructions=False)
+        self.assertEqual(program.code[3], (JUMP_IF_NOT, 6))
+
+    def test_assignment_results_kept_when_stack_is_not_balanced(self):
+        # 'print' at the jump target takes 'b' left on the stack by assignment
+        tokens = 'b var 34 := 1 2 > 10 goto_if_not 5 print'.split()
+        program = compile_rpn(tokens)
+        self.assertEqual(program.code[:4], [
+            (DECLARE, 0),
+            (LOAD_CONST, 0),
+            (STORE, 0),
+            (LOAD_VAR, 0),
+        ])
+
+    def test_label_names(self):
+        tokens = 'top label a print top goto'.split()
+        program = compile_rpn(tokens)
+        self.assertEqual(program.code, [(LOAD_VAR, 0), (OPCODES['print'], 1), (JUMP, 0)])
+
+    def test_constants_not_from_scanner(self):
+        const_id = tokens_map['_CONST'].id
+        # '8' gets slot 0 first, then scanner asks for it
+        tokens = ['8', ProgramToken('5', const_id, 0), '+']
+        program = compile_rpn(tokens)
+        self.assertEqual([program.constants[arg] for _, arg in program.code[:2]], [8, 5])
+
+    def test_lines(self):
+        ident_id = tokens_map['_IDENT'].id
+        const_id = tokens_map['_CONST'].id
+        tokens = [
+            ProgramToken('a', ident_id, 0, 1),
+            ProgramToken('1', const_id, 0, 1),
+            ProgramToken(':=', tokens_map[':='].id, '', 1),
+            # jump generated by RPN builder takes line of the previous token
+            '0',
+            'goto',
+            ProgramToken('a', ident_id, 0, 3),
+            ProgramToken('print', tokens_map['print'].id, '', 3),
+        ]
+        program = compile_rpn(tokens, superinstructions=False)
+        self.assertEqual(program.lines, [1, 1, 1, 3, 3])
+
+
+class PeepholeTestCase(TestCase):
+    def test_superinstructions(self):
+        # repeat a := a + 1 until a > 5
+        tokens = 'a var 0 := a a 1 + := a 5 > 4 goto_if_not a print'.split()
+        program = compile_rpn(tokens)
+        self.assertEqual(program.code, [
+            (DECLARE, 0),
+            (LOAD_CONST, 0),
+            (STORE, 0),
+            (INCREMENT, (0, 1)),
+            (COMPARE_JUMP_IF_NOT, (0, 5, OPCODES['>'], 3)),
+            (LOAD_VAR, 0),
+            (OPCODES['print'], 1),
+        ])
+
+    def test_jump_target_inside_is_not_fused(self):
+        tokens = 'a 1 > 2 goto_if_not'.split()
+        program = compile_rpn(tokens)
+        self.assertEqual(program.code[3], (JUMP_IF_NOT, 2))
+
+    def test_superinstruction_takes_first_line(self):
+        tokens = 'a a 1 + := a print'.split()
+        program = compile_rpn(tokens, superinstructions=False)
+        program.lines = [1, 2, 2, 2, 3, 3]
+        self.assertEqual(peephole(program).lines, [1, 3, 3])
@@ -0,0 +1,51 @@
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase, mock
+
+from source.cache import ProgramCache
+from source.exec import Executor
+
+PROGRAM = 'var a := 2\nprint a * 3\n'
+
+
+class ProgramCacheTestCase(TestCase):
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.cache = ProgramCache(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_hit(self):
+        self.assertIsNone(self.cache.get(PROGRAM))
+        program = self.cache.compile(PROGRAM)
+
+        timings = {}
+        with mock.patch('source.cache.compile_source') as compile_source:
+            cached = self.cache.compile(PROGRAM, timings)
+        compile_source.assert_not_called()
+        self.assertEqual(list(timings), ['cache'])
+        self.assertEqual(cached.code, program.code)
+        self.assertEqual(Executor(cached).execute(), [6])
+
+    def test_compiler_version_is_in_key(self):
+        self.cache.compile(PROGRAM)
+        with mock.patch('source.cache.COMPILER_VERSION', -1):
+            self.assertIsNone(self.cache.get(PROGRAM))
+
+    def test_broken_entry_is_a_miss(self):
+        self.cache.compile(PROGRAM)
+        with open(os.path.join(self.directory.name, os.listdir(self.directory.name)[0]), 'wb') as f:
+            f.write(b'broken')
+        self.assertIsNone(self.cache.get(PROGRAM))
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+    def test_eviction(self):
+        self.cache.compile('print 0\n')
+        entry_size = os.path.getsize(os.path.join(self.directory.name,
+                                                  os.listdir(self.directory.name)[0]))
+        self.cache.max_size = entry_size * 2
+        for value in range(1, 5):
+            self.cache.compile(f'print {value}\n')
+        self.assertLessEqual(len(os.listdir(self.directory.name)), 2)
+        self.assertIsNotNone(self.cache.get('print 4\n'))
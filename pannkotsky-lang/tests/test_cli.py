@@ -0,0 +1,35 @@
+from tempfile import NamedTemporaryFile
+from unittest import TestCase
+
+from click.testing import CliRunner
+
+from cli import cli
+
+# prints sum of two input values
+PROGRAM = 'var a := input\nvar b := input\nprint a + b\n'
+
+
+class CliTestCase(TestCase):
+    def setUp(self):
+        self.program = NamedTemporaryFile('w', suffix='.pkl')
+        self.program.write(PROGRAM)
+        self.program.flush()
+
+    def tearDown(self):
+        self.program.close()
+
+    def test_execute(self):
+        result = CliRunner().invoke(cli, ['execute', self.program.name, '--input', '-'],
+                                    input='2 3\n')
+        self.assertEqual(result.exit_code, 0)
+        self.assertTrue(result.output.endswith('Executor output\n5\n'))
+
+    def test_runtime_error(self):
+        for command in ('execute', 'run'):
+            with self.subTest(command=command):
+                result = CliRunner().invoke(cli, [command, self.program.name, '--input', '-'],
+                                            input='2\n')
+                # error is shown without traceback
+                self.assertIsInstance(result.exception, SystemExit)
+                self.assertEqual(result.exit_code, 1)
+                self.assertTrue(result.output.endswith('No more input values\n'))
@@ -0,0 +1,91 @@
+from tempfile import TemporaryDirectory
+from unittest import TestCase, mock
+
+from source.bytecode import compile_rpn
+from source.cache import ProgramCache
+from source.codegen import PythonExecutor, compile_python, generate_python
+from source.optimize import optimize_rpn
+from tests.helpers import ExecutorComparisonTestCase, build_rpn, example_programs, random_program
+
+
+class CodegenTestCase(ExecutorComparisonTestCase):
+    def assertPythonSameAsExecutor(self, program, inputs=()):
+        self.assertSameAsExecutor(program, PythonExecutor(program), inputs)
+
+    def test_structured(self):
+        # if a < 3 with repeat ... until inside
+        program = compile_rpn(build_rpn('var a := input\nif a < 3\nrepeat\na := a + 1\n'
+                                        'print a\nuntil a > 4\n\nprint a\n'))
+        source = generate_python(program)
+        self.assertIn('while True:', source)
+        self.assertNotIn('_block', source)
+        self.assertPythonSameAsExecutor(program, ['1'])
+        self.assertPythonSameAsExecutor(program, ['7'])
+
+    def test_goto_uses_dispatch_loop(self):
+        program = compile_rpn('a var 0 := top label a a 1 + := a 3 < 18 goto_if_not '
+                              'top goto a print'.split())
+        self.assertIn('_block', generate_python(program))
+        self.assertPythonSameAsExecutor(program)
+
+    def test_computed_jump_is_not_translated(self):
+        program = compile_rpn('1 print 3 3 + goto 2 print'.split())
+        self.assertIsNone(generate_python(program))
+        self.assertEqual(PythonExecutor(program).execute(), [1, 2])
+
+    def test_errors(self):
+        self.assertPythonSameAsExecutor(compile_rpn('a var 1 0 / print'.split()))
+        self.assertPythonSameAsExecutor(compile_rpn('a var a 1 + print'.split()))
+        # conditions must be boolean
+        self.assertPythonSameAsExecutor(compile_rpn('1 4 goto_if_not 2 print'.split()))
+
+    def test_examples(self):
+        for path, source in example_programs():
+            rpn_tokens = build_rpn(source)
+            for superinstructions in (True, False):
+                with self.subTest(path=path, superinstructions=superinstructions):
+                    program = compile_rpn(rpn_tokens, superinstructions)
+                    self.assertIsNotNone(generate_python(program))
+                    self.assertPythonSameAsExecutor(program, ['3', '7'])
+
+    def test_random_programs(self):
+        for seed in range(100):
+            source = random_program(seed)
+            rpn_tokens = build_rpn(source)
+            for optimize in (False, True):
+                with self.subTest(source=source, optimize=optimize):
+                    program = compile_rpn(optimize_rpn(rpn_tokens) if optimize else rpn_tokens)
+                    self.assertIsNotNone(generate_python(program))
+                    self.assertPythonSameAsExecutor(program)
+
+    def test_dropped_declaration(self):
+        source = 'var a := 1\nif 1 > 2\nvar b := 2\nprint b\n\nvar c := 3\nprint c + a\n'
+        program = compile_rpn(optimize_rpn(build_rpn(source)))
+        self.assertIn(None, program.names)
+        self.assertEqual(PythonExecutor(program).execute(), [4])
+
+    def test_python_compiler_limits(self):
+        long_expression = 'var a := 1\nprint ' + ' + '.join(['a'] * 300) + '\n'
+        nested_loops = ('var a := 0\n' + 'repeat\n' * 21 + 'a := a + 1\n'
+                        + 'until a > 0\n' * 21 + 'print a\n')
+        for source, output in ((long_expression, [300]), (nested_loops, [1])):
+            with self.subTest(source=source):
+                program = compile_rpn(build_rpn(source))
+                self.assertIsNone(compile_python(program))
+                self.assertEqual(PythonExecutor(program).execute(), output)
+
+
+class PythonCacheTestCase(TestCase):
+    def test_hit(self):
+        source = 'var a := 2\nrepeat\na := a * 3\nuntil a > 50\nprint a\n'
+        with TemporaryDirectory() as directory:
+            cache = ProgramCache(directory)
+            program, code = cache.compile_python(source)
+
+            timings = {}
+            with mock.patch('source.cache.compile_python') as compile_python:
+                cached_program, cached_code = cache.compile_python(source, timings)
+            compile_python.assert_not_called()
+            self.assertEqual(list(timings), ['cache'])
+            self.assertEqual(cached_code, code)
+            self.assertEqual(PythonExecutor(cached_program, cached_code).execute(), [54])
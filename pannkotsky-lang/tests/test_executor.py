@@ -1,6 +1,12 @@
+from io import StringIO
+from tempfile import TemporaryDirectory
 from unittest import TestCase
 
+from source.bytecode import compile_rpn
+from source.cache import ProgramCache
+from source.errors import PKLRuntimeError
 from source.exec import Executor
+from source.pipeline import compile_source
 from tests.helpers import captured_output
 
 
@@ -52,3 +58,110 @@ class ExecutorTestCase(TestCase):
 
         output = out.getvalue()
         self.assertEqual(output, '5\n34\n')
+
+    def test_steps(self):
+        executor = Executor('a var a 1 2 + := a print'.split())
+        executor.execute()
+        self.assertEqual(executor.steps, 7)
+
+    def test_step_limit(self):
+        # a := a + 1 forever
+        tokens = 'a var 0 := a a 1 + := 1 goto'.split()
+        executor = Executor(tokens, max_steps=100)
+        with self.assertRaises(PKLRuntimeError):
+            executor.execute()
+        self.assertGreater(executor.steps, 100)
+        self.assertLessEqual(executor.steps, 110)
+
+
+class ProfileTestCase(TestCase):
+    # a := a + 1 until a > 2, then jump over 'a print' to 'a 1 - print'
+    tokens = 'a var 0 := a a 1 + := a 2 > 4 goto_if_not 18 goto a print a 1 - print'.split()
+
+    def test_output_and_steps_are_kept(self):
+        executor = Executor(self.tokens)
+        output = executor.execute()
+        profiled = Executor(self.tokens, profile=True)
+        self.assertEqual(profiled.execute(), output)
+        self.assertEqual(profiled.steps, executor.steps)
+
+    def test_counts(self):
+        executor = Executor(self.tokens, profile=True)
+        executor.execute()
+        counts = {opcode: count for opcode, (count, _) in executor.profiler.opcodes.items()}
+        self.assertEqual(counts, {
+            'DECLARE': 1,
+            'LOAD_CONST': 2,
+            'STORE': 1,
+            'INCREMENT': 3,
+            'COMPARE_JUMP_IF_NOT': 3,
+            'JUMP': 1,
+            'LOAD_VAR': 1,
+            '-': 1,
+            'print': 1,
+        })
+        self.assertEqual(sum(count for count, _ in executor.profiler.lines.values()), 14)
+        self.assertEqual(executor.steps, 14)
+
+    def test_step_limit(self):
+        tokens = 'a var 0 := a a 1 + := 1 goto'.split()
+        executor = Executor(tokens, max_steps=100, profile=True)
+        with self.assertRaises(PKLRuntimeError):
+            executor.execute()
+        self.assertLessEqual(executor.steps, 110)
+
+
+class ResumeTestCase(TestCase):
+    # a := a + 1, print a until a >= 10
+    tokens = 'a var 0 := a a 1 + := a print a 10 >= 4 goto_if_not'.split()
+
+    def test_run_pauses(self):
+        executor = Executor(self.tokens)
+        self.assertFalse(executor.run(10))
+        self.assertLess(executor.output_cursor, 10)
+        self.assertTrue(executor.run(1000))
+        self.assertEqual(executor.execute(), list(range(1, 11)))
+
+    def test_snapshot_and_restore(self):
+        program = compile_rpn(self.tokens)
+        executor = Executor(program)
+        output = []
+        while not executor.run(5):
+            output += executor.output
+            executor = Executor.restore(program, executor.snapshot())
+            self.assertEqual(executor.output_cursor, len(output))
+        output += executor.output
+        self.assertEqual(output, list(range(1, 11)))
+
+        uninterrupted = Executor(program)
+        uninterrupted.execute()
+        self.assertEqual(executor.steps, uninterrupted.steps)
+
+    def test_budget_is_kept_after_restore(self):
+        executor = Executor(self.tokens, max_steps=30)
+        executor.run(20)
+        restored = Executor.restore(self.tokens, executor.snapshot(), max_steps=30)
+        with self.assertRaises(PKLRuntimeError):
+            restored.execute()
+
+    def test_restore_in_another_process(self):
+        source = 'var a := 0\nrepeat\na := a + 1\nprint a\nuntil a >= 10\n'
+        with TemporaryDirectory() as directory:
+            program = ProgramCache(directory).compile(source)
+            executor = Executor(program)
+            executor.run(5)
+            snapshot = executor.snapshot()
+            # executors created after snapshot do not change the program
+            Executor(program, profile=True)
+            # program is compiled anew or loaded from the cache by another process
+            for same_program in (program, compile_source(StringIO(source)),
+                                 ProgramCache(directory).get(source)):
+                with self.subTest(program=same_program):
+                    restored = Executor.restore(same_program, snapshot)
+                    self.assertEqual(restored.execute(),
+                                     list(range(executor.output_cursor + 1, 11)))
+
+    def test_snapshot_of_another_program(self):
+        snapshot = Executor(self.tokens).snapshot()
+        with self.assertRaises(ValueError):
+            Executor.restore('1 print'.split(), snapshot)
@@ -0,0 +1,84 @@
+import asyncio
+from io import StringIO
+from unittest import TestCase
+from unittest.mock import patch
+
+from source.errors import PKLRuntimeError
+from source.exec import Executor
+from source.inputs import AsyncInput, InputPending, IterableInput, StreamInput
+from source.output import StreamSink
+
+# prints sum of input values up to the first 0
+TOKENS = 's var 0 := x var x input := s s x + := x 0 == 6 goto_if_not s print'.split()
+
+
+class InputProviderTestCase(TestCase):
+    def test_iterable(self):
+        self.assertEqual(Executor(TOKENS, inputs=[1, 2, 0]).execute(), [3])
+        self.assertEqual(Executor(TOKENS, inputs=IterableInput(iter([5, 0]))).execute(), [5])
+        with self.assertRaisesRegex(PKLRuntimeError, 'No more input values'):
+            Executor(TOKENS, inputs=[1, 2]).execute()
+
+    def test_stream(self):
+        # values are split between chunks
+        stream = StringIO('12 -3\n\n100   7\t0 999')
+        executor = Executor(TOKENS, inputs=StreamInput(stream, chunk_size=2))
+        self.assertEqual(executor.execute(), [116])
+
+    def test_stream_invalid(self):
+        with self.assertRaisesRegex(PKLRuntimeError, 'x1 is not a valid integer number'):
+            Executor(TOKENS, inputs=StreamInput(StringIO('1 x1 0'))).execute()
+        with self.assertRaisesRegex(PKLRuntimeError, 'No more input values'):
+            Executor(TOKENS, inputs=StreamInput(StringIO('1 2 '))).execute()
+
+    def test_prompt_flushes_output(self):
+        stream = StringIO()
+
+        def prompt(text):
+            stream.write(text)
+            return '0'
+
+        with patch('builtins.input', prompt):
+            Executor('5 print a var input := a print'.split(), output=StreamSink(stream)).execute()
+        # value printed before input is shown above the prompt
+        self.assertEqual(stream.getvalue(), '5\nEnter integer number: 0\n')
+
+
+class AsyncInputTestCase(TestCase):
+    def test_execute_async(self):
+        async def main():
+            first, second = AsyncInput(), AsyncInput()
+            tasks = [asyncio.ensure_future(Executor(TOKENS, inputs=inputs).execute_async())
+                     for inputs in (first, second)]
+            # both programs wait for input at the same time
+            await asyncio.sleep(0)
+            first.feed('1 2')
+            second.feed('10')
+            await asyncio.sleep(0)
+            second.feed('20 0')
+            first.feed('3')
+            await asyncio.sleep(0)
+            first.feed('0 5')
+            return await asyncio.gather(*tasks)
+
+        self.assertEqual(asyncio.run(main()), [[6], [30]])
+
+    def test_pending_input_steps(self):
+        inputs = AsyncInput()
+        executor = Executor(TOKENS, max_steps=100, inputs=inputs)
+        inputs.feed('4')
+        with self.assertRaises(InputPending):
+            executor.run(1000)
+        steps = executor.steps
+        # input is executed again when value comes
+        inputs.feed('0')
+        self.assertTrue(executor.run(1000))
+        self.assertEqual(executor.output, [4])
+        self.assertGreater(executor.steps, steps)
+
+    def test_closed(self):
+        inputs = AsyncInput()
+        inputs.feed('1')
+        inputs.close()
+        with self.assertRaisesRegex(PKLRuntimeError, 'No more input values'):
+            asyncio.run(Executor(TOKENS, inputs=inputs).execute_async())
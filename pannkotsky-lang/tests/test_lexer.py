@@ -0,0 +1,92 @@
+import mmap
+import random
+import tempfile
+from io import BytesIO, StringIO
+from unittest import TestCase
+
+from benchmarks.suite import generate_program
+from source.errors import PKLanguageError
+from source.lexer import RegexScanner
+from source.scan import Scanner
+
+DECLARATIONS = 'var a\nvar b1\nlabel c\n'
+FRAGMENTS = ['a', 'b1', 'c', '12', '0', ' ', '   ', ':=', '==', '!=', '<', '<=', '>', '>=',
+             '+', '-', '*', '/', '^', '(', ')', '\n', 'print ', 'input', 'repeat', 'goto']
+INVALID_FRAGMENTS = ['var ', 'label ', 'ifx', ':', '=', '!', 'A', '_', '_IDENT', '$', 'é', '\t',
+                     '1a']
+
+
+def scan(scanner_class, source):
+    """ Returns tokens and tables or the error of the scanner. """
+
+    scanner = scanner_class(StringIO(source))
+    try:
+        tokens = scanner.scan()
+    except PKLanguageError as e:
+        return e.__class__, str(e)
+    return ([token.to_table_row() for token in tokens],
+            scanner.idents_map, scanner.constants_map, scanner.labels_map)
+
+
+class RegexScannerTestCase(TestCase):
+    def assertSameAsScanner(self, source):
+        self.assertEqual(scan(RegexScanner, source), scan(Scanner, source), repr(source))
+
+    def test_random_sources(self):
+        generator = random.Random(0)
+        for fragments in [FRAGMENTS, FRAGMENTS + INVALID_FRAGMENTS]:
+            for _ in range(2000):
+                source = DECLARATIONS + ''.join(generator.choice(fragments)
+                                                for _ in range(generator.randint(0, 40)))
+                self.assertSameAsScanner(source)
+
+    def test_programs(self):
+        for depth in range(3):
+            self.assertSameAsScanner(generate_program(300, depth, seed=depth))
+
+    def test_errors(self):
+        for source in ['var a := 1$\n', 'var a\na := 12b\n', 'var a :  = 1\n', 'var a\na ! 1\n',
+                       'var ab', 'var a\nprint a <', 'var x\n\nprint y\n', 'var a\nvar a\n']:
+            self.assertSameAsScanner(source)
+
+    def test_buffer(self):
+        source = 'var a := 10\nlabel l\nprint a <= 2\n'
+        expected = scan(Scanner, source)
+        with tempfile.TemporaryFile() as f:
+            f.write(source.encode())
+            f.flush()
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                scanner = RegexScanner(buffer)
+                tokens = [token.to_table_row() for token in scanner.scan()]
+        self.assertEqual((tokens, scanner.idents_map, scanner.constants_map, scanner.labels_map),
+                         expected)
+        with self.assertRaisesRegex(PKLanguageError, 'at line 2, char 3: Unexpected token: é'):
+            RegexScanner('var a\na é\n'.encode()).scan()
+
+    def test_iter_tokens(self):
+        source = 'var a := 1\nprint a\n'
+        tokens = RegexScanner(StringIO(source)).iter_tokens()
+        self.assertEqual([token.to_table_row() for token in tokens], scan(Scanner, source)[0])
+
+    def test_chunks(self):
+        source = generate_program(100, 2, seed=1)
+        expected = scan(Scanner, source)
+        for chunk_size in [1, 2, 7, 64, 10000]:
+            with self.subTest(chunk_size=chunk_size):
+                for input_file in [StringIO(source), BytesIO(source.encode())]:
+                    scanner = RegexScanner(input_file, chunk_size=chunk_size)
+                    tokens = [token.to_table_row() for token in scanner.scan()]
+                    self.assertEqual((tokens, scanner.idents_map, scanner.constants_map,
+                                      scanner.labels_map), expected)
+
+    def test_chunk_errors(self):
+        # positions of errors are kept across chunks
+        for source in ['var abc := 1\nprint abc + 2\nprint abc ! 3\n',
+                       'var abc := 1\n\nprint abd\n', 'var a := 1\n  a := 2a\n']:
+            expected = scan(Scanner, source)
+            for chunk_size in [1, 3, 16, 100]:
+                with self.subTest(source=source, chunk_size=chunk_size):
+                    with self.assertRaises(PKLanguageError) as context:
+                        RegexScanner(StringIO(source), chunk_size=chunk_size).scan()
+                    self.assertEqual((context.exception.__class__, str(context.exception)),
+                                     expected)
@@ -0,0 +1,49 @@
+from source.exec import Executor
+from source.optimize import optimize_rpn
+from tests.helpers import ExecutorComparisonTestCase, build_rpn, example_programs
+
+
+class OptimizeTestCase(ExecutorComparisonTestCase):
+    def test_fold_constants(self):
+        tokens = 'a var 15 7 5 * 2 ^ + := a print'.split()
+        self.assertEqual(optimize_rpn(tokens), 'a var 1240 := a print'.split())
+
+    def test_division_by_zero_is_not_folded(self):
+        tokens = '1 0 / print'.split()
+        self.assertEqual(optimize_rpn(tokens), tokens)
+
+    def test_huge_power_is_not_computed(self):
+        program = 'var a := 1\nif a > 2\nprint 7 ^ 300000000\n\nprint a\n'
+        tokens = optimize_rpn(build_rpn(program))
+        self.assertIn('300000000', tokens)
+        self.assertEqual(Executor(tokens).execute(), [1])
+
+    def test_comparison_result_is_kept(self):
+        tokens = '1 2 < print'.split()
+        self.assertEqual(optimize_rpn(tokens), tokens)
+
+    def test_true_condition(self):
+        tokens = '1 2 < 7 goto_if_not 5 print 9 print'.split()
+        self.assertEqual(optimize_rpn(tokens), '5 print 9 print'.split())
+
+    def test_false_condition(self):
+        tokens = '1 2 > 7 goto_if_not 5 print 9 print'.split()
+        self.assertEqual(optimize_rpn(tokens), '9 print'.split())
+
+    def test_jump_targets_are_remapped(self):
+        # repeat a := a + 2 * 3 until a > 10
+        tokens = 'a var 0 := a a 2 3 * + := a 10 > 4 goto_if_not a print'.split()
+        self.assertEqual(optimize_rpn(tokens),
+                         'a var 0 := a a 6 + := a 10 > 4 goto_if_not a print'.split())
+
+    def test_computed_jumps_are_not_optimized(self):
+        tokens = 'a var 2 := 1 2 + print a goto'.split()
+        self.assertEqual(optimize_rpn(tokens), tokens)
+
+    def test_same_output(self):
+        programs = [source for _, source in example_programs()]
+        programs.append('var a := 0\nlabel x\na := a + 1\nif 3 > 4\ngoto x\n\n'
+                        'repeat\na := a + 2 * 3\nuntil 1 < 2\nprint a\n')
+        for program in programs:
+            rpn_tokens = build_rpn(program)
+            self.assertSameAsExecutor(rpn_tokens, Executor(optimize_rpn(rpn_tokens)), ['3', '7'])
@@ -0,0 +1,30 @@
+from io import StringIO
+from unittest import TestCase
+
+from source.exec import Executor
+from source.output import CallbackSink, RingBufferSink, StreamSink
+
+# prints 1..10
+TOKENS = 'a var 0 := a a 1 + := a print a 10 >= 4 goto_if_not'.split()
+
+
+class OutputSinkTestCase(TestCase):
+    def test_stream(self):
+        stream = StringIO()
+        executor = Executor(TOKENS, output=StreamSink(stream, buffer_size=4))
+        executor.run(10)
+        # values are written in batches and the rest when execution stops
+        self.assertEqual(stream.getvalue(), ''.join(f'{value}\n' for value in range(1, 3)))
+        self.assertEqual(executor.execute(), [])
+        self.assertEqual(stream.getvalue(), ''.join(f'{value}\n' for value in range(1, 11)))
+        self.assertEqual(executor.output_cursor, 10)
+
+    def test_ring_buffer(self):
+        output = RingBufferSink(3)
+        self.assertEqual(Executor(TOKENS, output=output).execute(), [8, 9, 10])
+        self.assertEqual(output.dropped, 7)
+
+    def test_callback(self):
+        values = []
+        Executor(TOKENS, output=CallbackSink(values.append)).execute()
+        self.assertEqual(values, list(range(1, 11)))
@@ -0,0 +1,60 @@
+from io import StringIO
+from unittest import TestCase, mock
+
+from source.bytecode import ProgramStream
+from source.errors import PKLSyntaxError
+from source.exec import Executor
+from source.pipeline import run_source, stream_program
+from tests.helpers import ExecutorComparisonTestCase, build_rpn, execute
+
+PROGRAM = '''var a := 0
+var b := input
+label top
+a := a + 1
+if a < b
+goto top
+
+repeat
+b := b - 2
+print b
+until b < 0
+print a
+'''
+
+
+class StreamProgramTestCase(ExecutorComparisonTestCase):
+    def test_same_output(self):
+        rpn_tokens = build_rpn(PROGRAM)
+        self.assertEqual(execute(Executor(rpn_tokens), ['5']), [3, 1, -1, 5])
+        self.assertSameAsExecutor(rpn_tokens, Executor(stream_program(StringIO(PROGRAM))), ['5'])
+
+    @mock.patch.object(ProgramStream, 'COMPACT_SIZE', 8)
+    def test_code_is_dropped(self):
+        program = 'var a := 0\n' + 'a := a + 1\n' * 1000 + 'print a\n'
+        stream = stream_program(StringIO(program))
+        self.assertEqual(Executor(stream).execute(), [1000])
+        self.assertLess(len(stream.code), 100)
+
+    @mock.patch.object(ProgramStream, 'COMPACT_SIZE', 8)
+    def test_labels_are_kept(self):
+        program = 'var a := 0\nlabel top\n' + 'a := a + 1\n' * 100 + 'if a < 300\ngoto top\n\nprint a\n'
+        stream = stream_program(StringIO(program))
+        self.assertEqual(Executor(stream).execute(), [300])
+
+    def test_syntax_error_after_output(self):
+        executor = Executor(stream_program(StringIO('print 1\nprint\n')))
+        with self.assertRaises(PKLSyntaxError):
+            executor.execute()
+        self.assertEqual(executor.output, [1])
+
+
+class RunSourceTestCase(TestCase):
+    def test_run(self):
+        timings = {}
+        with mock.patch('builtins.input', return_value='5'):
+            output = run_source(StringIO(PROGRAM), timings)
+        self.assertEqual(output, [3, 1, -1, 5])
+        self.assertEqual(list(timings), ['scan', 'syntax', 'rpn', 'compile', 'execute'])
+
+    def test_empty_program(self):
+        self.assertEqual(run_source(StringIO('')), [])
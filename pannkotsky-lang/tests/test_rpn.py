@@ -1,6 +1,7 @@
 from unittest import TestCase, mock
 
 from source.rpn import RPNBuilder
+from source.tokens import ProgramToken, tokens_map
 
 
 class RPNTestCase(TestCase):
@@ -85,3 +86,21 @@ class RPNTestCase(TestCase):
                            'b b 2 - := '
                            ' a b > 8 goto_if_not').split()
         self.assertEqual(RPNBuilder(tokens).build(), expected_output)
+
+    def test_keeps_scanner_ids(self):
+        ident_id = tokens_map['_IDENT'].id
+        tokens = [
+            ProgramToken('print', tokens_map['print'].id, ''),
+            ProgramToken('a', ident_id, 3),
+        ]
+        output = RPNBuilder(tokens).build()
+        self.assertEqual(output, ['a', 'print'])
+        self.assertEqual((output[0].token_id, output[0].ident_id), (ident_id, 3))
+
+    def test_replace_labels(self):
+        tokens = ('x label y label a print '
+                  'y goto '
+                  'z label b print '
+                  'x goto z goto w goto w label').split()
+        expected_output = 'a print 0 goto b print 0 goto 4 goto 12 goto'.split()
+        self.assertEqual(RPNBuilder.replace_labels(tokens), expected_output)
@@ -0,0 +1,50 @@
+from io import StringIO
+from unittest import TestCase
+
+from source.scan import Scanner
+from source.tokens import tokens_map
+
+
+class ScannerTestCase(TestCase):
+    def test_trace_is_off_by_default(self):
+        scanner = Scanner(StringIO('var a := 1\n'))
+        scanner.scan()
+        self.assertIsNone(scanner.trace)
+        self.assertEqual(scanner.output, [])
+
+    def test_trace(self):
+        scanner = Scanner(StringIO('var a\n'), trace=True)
+        scanner.scan()
+        self.assertEqual(scanner.output, [
+            [1, 1, 'v', 1, 'v'],
+            [1, 2, 'a', 1, 'va'],
+            [1, 3, 'r', 1, 'var'],
+            [1, 3, ' ', 16, 'var'],
+            [1, 3, ' ', 0, ''],
+            [1, 4, ' ', 15, ' '],
+            [1, 4, 'a', 19, ' '],
+            [1, 4, 'a', 0, ''],
+            [1, 5, 'a', 1, 'a'],
+            [1, 5, '\n', 16, 'a'],
+            [1, 5, '\n', 0, ''],
+            [1, 6, '\n', 11, '\n'],
+        ])
+
+    def test_iter_tokens(self):
+        scanner = Scanner(StringIO('var a := 1\nprint a\n'))
+        tokens = scanner.iter_tokens()
+        self.assertEqual([token.token_repr for token in tokens],
+                         ['var', 'a', ':=', '1', '\\n', 'print', 'a', '\\n'])
+        # tokens are not kept by the scanner
+        self.assertEqual(len(scanner.scan_tokens), 0)
+
+    def test_token_store(self):
+        scanner = Scanner(StringIO('var ab := 10\nab := ab + 10\n'))
+        tokens = scanner.scan()
+        self.assertEqual(len(tokens), 11)
+        # representations are interned
+        self.assertEqual(tokens.strings, ['var', 'ab', ':=', '10', '\\n', '+'])
+        self.assertEqual(tokens[5].to_table_row(), (2, 'ab', tokens_map['_IDENT'].id, 0))
+        self.assertEqual(tokens[-1].to_table_row(), (2, '\\n', tokens_map['\n'].id, ''))
+        self.assertEqual(list(tokens.rows()), [token.to_table_row() for token in tokens])
+        self.assertEqual(tokens[3].to_program_token().ident_id, 0)
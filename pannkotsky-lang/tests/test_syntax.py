@@ -0,0 +1,101 @@
+import gc
+import tracemalloc
+from unittest import TestCase
+
+from source.errors import PKLSyntaxError
+from source.lexer import RegexScanner
+from source.syntax import SyntaxAnalyzer
+from source.tokens import TokenStore, tokens_map
+
+
+def make_tokens(program: str):
+    """ Builds scan tokens for program with tokens separated by spaces. """
+
+    scan_tokens = TokenStore()
+    for numline, line in enumerate(program.split('\n'), start=1):
+        for token in line.split() + ['\n']:
+            if token in tokens_map:
+                token_obj = tokens_map[token]
+            elif token.isdigit():
+                token_obj = tokens_map['_CONST']
+            elif token.startswith('l'):
+                token_obj = tokens_map['_LABEL']
+            else:
+                token_obj = tokens_map['_IDENT']
+            scan_tokens.append(numline, token_obj.representation if token == '\n' else token,
+                               token_obj.id, '')
+    return scan_tokens
+
+
+class SyntaxAnalyzerTestCase(TestCase):
+    def test_program(self):
+        tokens = make_tokens('var a := 1\n'
+                             'label lb\n'
+                             'repeat\n'
+                             'a := ( a + 1 ) * 2\n'
+                             'if a > 4\n'
+                             'print a\n'
+                             '\n'
+                             'until a > 10\n'
+                             'goto lb')
+        self.assertEqual(SyntaxAnalyzer(tokens).run(), [str(token) for token in tokens])
+
+    def test_unexpected_token(self):
+        tokens = make_tokens('var a := 1\n'
+                             'print a b')
+        with self.assertRaisesRegex(PKLSyntaxError,
+                                    r"at line 2: \['\\n'\] expected, got _IDENT"):
+            SyntaxAnalyzer(tokens).run()
+
+    def test_unexpected_end_of_program(self):
+        tokens = make_tokens('var a := 1\n'
+                             'repeat\n'
+                             'a := a + 1')
+        with self.assertRaisesRegex(PKLSyntaxError, 'at line 3: Unexpected end of program'):
+            SyntaxAnalyzer(tokens).run()
+
+    def test_iterable_input(self):
+        # tokens read from iterable are released statement by statement
+        tokens = make_tokens('var a := 1\n'
+                             'repeat\n'
+                             'a := a + 1\n'
+                             'until a > 3\n'
+                             'print a')
+        analyzer = SyntaxAnalyzer(iter(tokens))
+        statements = list(analyzer.iter_statements())
+        self.assertEqual(len(statements), 3)
+        self.assertEqual([token for statement in statements for token in statement],
+                         [str(token) for token in tokens])
+        self.assertEqual(list(statements[2].numlines), [5, 5, 5])
+        self.assertLess(len(analyzer._store), len(statements[2]) + 1)
+
+        with self.assertRaisesRegex(PKLSyntaxError, 'at line 2: Unexpected end of program'):
+            SyntaxAnalyzer(iter(make_tokens('var a := 1\nrepeat'))).run()
+
+    def test_error_messages(self):
+        for program, message in [
+            ('var a := ( )', r"at line 1: \['_IDENT', '_CONST', 'input'\] expected, got \)"),
+            ('var a := ( 1 + 2', r"at line 1: \['\)'\] expected, got \n"),
+            ('var := 1', r"at line 1: \['_IDENT'\] expected, got :="),
+            ('var a := 1\nrepeat\na := 2\nprint', r"at line 4: \['until'\] expected, got print"),
+            ('var a := 1\nif a 1\n', r"at line 2: \['<', '>', '<=', '>=', '==', '!='\] expected"),
+            ('goto 1', r"at line 1: \['_LABEL'\] expected, got _CONST"),
+            (':= 1', r"at line 1: \['\\n'\] expected, got :="),
+        ]:
+            with self.subTest(program=program):
+                with self.assertRaisesRegex(PKLSyntaxError, message):
+                    SyntaxAnalyzer(make_tokens(program)).run()
+
+    def test_memory_per_token(self):
+        source = 'var a := 1\n' + 'repeat\na := a + 1\nuntil a > 3\n' * 2000
+        scan_tokens = RegexScanner(source).scan()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            tokens = SyntaxAnalyzer(scan_tokens).run()
+            gc.collect()
+            size, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        # representations are shared with the scanner, the rest is kept in int columns
+        self.assertLess(size / len(tokens), 32)
@@ -0,0 +1,49 @@
+from unittest import TestCase, skipIf
+
+from source.batch import execute_vector
+from source.bytecode import compile_rpn
+from source.vectorized import execute_vectorized, is_vectorizable, np, run_vectorized
+
+MAX = 2 ** 63 - 1
+
+
+@skipIf(np is None, 'NumPy is not installed')
+class VectorizedTestCase(TestCase):
+    def assertSameAsExecutor(self, tokens, vectors):
+        program = compile_rpn(tokens.split())
+        self.assertTrue(is_vectorizable(program))
+        expected = [(inputs, *execute_vector(program, inputs)) for inputs in vectors]
+        self.assertEqual(execute_vectorized(program, vectors), expected)
+
+    def test_is_vectorizable(self):
+        self.assertTrue(is_vectorizable(compile_rpn('a var input := a 2 * print'.split())))
+        self.assertFalse(is_vectorizable(compile_rpn('input 1 > 5 goto_if_not 1 print'.split())))
+        self.assertFalse(is_vectorizable(compile_rpn('1 2 < print'.split())))
+
+    def test_arithmetic(self):
+        self.assertSameAsExecutor('a var input := b var input := '
+                                  'a b + print a b - print a b * print a b / print 7 print',
+                                  [[7, 2], [-7, 2], [0, -3], [100, 7]])
+
+    def test_power(self):
+        self.assertSameAsExecutor('input input ^ print',
+                                  [[2, 10], [-3, 3], [2, 0], [2, 62], [2, 63], [-2, 63],
+                                   [3, 40], [2, -1], [0, -2], [1, MAX]])
+
+    def test_overflow_falls_back_to_executor(self):
+        self.assertSameAsExecutor('a var input := a 1 + print a 1 - print a a * print a -1 / print',
+                                  [[MAX], [-MAX - 1], [2 ** 32], [5]])
+
+    def test_division_by_zero(self):
+        self.assertSameAsExecutor('input input / print', [[1, 0], [6, 3]])
+
+    def test_missing_inputs_and_big_values(self):
+        self.assertSameAsExecutor('input input + print', [[1], [2 ** 70, 1], [1, 2, 3]])
+
+    def test_increment(self):
+        self.assertSameAsExecutor('a var input := a a 1 + := a print', [[1], [MAX]])
+
+    def test_program_with_jumps_runs_on_executor(self):
+        program = compile_rpn('input 1 > 7 goto_if_not 1 print 0 print'.split())
+        results = list(run_vectorized(program, [[2], [0]], workers=1))
+        self.assertEqual(results, [([2], [1, 0], None), ([0], [0], None)])
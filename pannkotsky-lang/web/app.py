@@ -1,8 +1,16 @@
+import multiprocessing
+import signal
+import threading
+from functools import lru_cache
 from io import StringIO
 
 from flask import Flask, render_template, request
 
-from source.errors import PKLanguageError
+from source.bytecode import Program, compile_rpn
+from source.cache import ProgramCache
+from source.errors import PKLanguageError, PKLRuntimeError
+from source.inputs import StreamInput
+from source.output import RingBufferSink
 from source.helpers import (get_language_tokens_table, get_scan_output_table,
                             get_program_tokens_table, get_idents_table, get_contants_table,
                             get_labels_table, get_rpn_table)
@@ -11,7 +19,138 @@ from source.syntax import SyntaxAnalyzer
 from source.rpn import RPNBuilder
 from source.exec import Executor
 
+# programs are executed in worker processes within these budgets, at most WORKERS
+# at once, so a runaway program can not take server workers forever
+MAX_STEPS = 10 ** 7
+TIME_LIMIT = 5
+WORKERS = 2
+# only the last printed values are kept and shown
+MAX_OUTPUT = 1000
+# amount of programs whose analysis results are kept in memory
+ANALYSIS_CACHE_SIZE = 128
+
 app = Flask(__name__)
+program_cache = ProgramCache()
+_workers = threading.BoundedSemaphore(WORKERS)
+
+
+def _execute_limited(program: Program, values: str):
+    """
+    Executes program in worker process with whitespace separated input values,
+    returns its last printed values, amount of the dropped earlier ones and error message.
+    """
+
+    def time_limit_exceeded(signum, frame):
+        raise PKLRuntimeError(f'Time limit of {TIME_LIMIT}s exceeded')
+
+    # without interval timer only the steps budget applies
+    has_timer = hasattr(signal, 'setitimer')
+    if has_timer:
+        handler = signal.signal(signal.SIGALRM, time_limit_exceeded)
+        signal.setitimer(signal.ITIMER_REAL, TIME_LIMIT)
+    output = RingBufferSink(MAX_OUTPUT)
+    try:
+        Executor(program, max_steps=MAX_STEPS, inputs=StreamInput(StringIO(values)),
+                 output=output).execute()
+        return output.values, output.dropped, None
+    except PKLanguageError as e:
+        return None, 0, str(e)
+    except Exception as e:
+        # e.g. division by zero
+        return None, 0, f'{e.__class__.__name__}: {e}'
+    finally:
+        if has_timer:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, handler)
+
+
+def _send_result(connection, program: Program, values: str):
+    connection.send(_execute_limited(program, values))
+    connection.close()
+
+
+def _execute(program: Program, values: str):
+    """
+    Executes program in its own worker process,
+    which is killed if it does not stop by itself.
+    """
+
+    with _workers:
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        process = multiprocessing.Process(target=_send_result, args=(sender, program, values),
+                                          daemon=True)
+        process.start()
+        sender.close()
+        try:
+            # worker stops the program itself, this is the last resort
+            if not receiver.poll(TIME_LIMIT + 1):
+                return None, 0, f'Time limit of {TIME_LIMIT}s exceeded'
+            return receiver.recv()
+        except EOFError:
+            # worker died without result
+            return None, 0, 'Execution failed'
+        finally:
+            receiver.close()
+            process.terminate()
+            process.join()
+
+
+@lru_cache(maxsize=ANALYSIS_CACHE_SIZE)
+def _analyze(program: str) -> dict:
+    """ Builds analysis tables and compiles program, results are cached by program text. """
+
+    context = {}
+    inp = StringIO(program)
+    scanner = Scanner(inp, trace=True)
+    error = None
+
+    try:
+        scan_tokens = scanner.scan()
+    except PKLanguageError as e:
+        error = e
+    else:
+        context.update({
+            'scan_output_table': get_scan_output_table(scanner),
+            'program_tokens_table': get_program_tokens_table(scanner),
+            'idents_table': get_idents_table(scanner),
+            'contants_table': get_contants_table(scanner),
+            'labels_table': get_labels_table(scanner),
+        })
+    finally:
+        inp.close()
+
+    if error is None:
+        syntax_analyzer = SyntaxAnalyzer(scan_tokens)
+        try:
+            syntax_tokens = syntax_analyzer.run()
+        except PKLanguageError as e:
+            error = e
+        else:
+            context['syntax_success'] = True
+
+    if error is None:
+        rpn_builder = RPNBuilder(syntax_tokens)
+        rpn_tokens = rpn_builder.build()
+        context.update({
+            'rpn_steps_table': get_rpn_table(rpn_builder),
+            'rpn_tokens': ' '.join(rpn_tokens),
+            'compiled': compile_rpn(rpn_tokens),
+        })
+
+    context['error'] = error
+    return context
+
+
+@lru_cache(maxsize=ANALYSIS_CACHE_SIZE)
+def _compile(program: str) -> Program:
+    return program_cache.compile(program)
+
+
+def _run(context, compiled: Program, values: str):
+    output, dropped, error = _execute(compiled, values)
+    context['executor_output'] = output
+    context['output_dropped'] = dropped
+    context['error'] = error
 
 
 @app.route('/', methods=['POST', 'GET'])
@@ -22,50 +161,22 @@ def index():
     if request.method == 'POST':
         program = request.form['program'].replace('\r\n', '\n')
         context['program'] = program
+        # values taken by input operator, program fails when they run out
+        values = request.form.get('input', '')
+        context['input'] = values
 
-        inp = StringIO(program)
-        scanner = Scanner(inp)
-        error = None
-
-        try:
-            scan_tokens = scanner.scan()
-        except PKLanguageError as e:
-            error = e
-        else:
-            context.update({
-                'scan_output_table': get_scan_output_table(scanner),
-                'program_tokens_table': get_program_tokens_table(scanner),
-                'idents_table': get_idents_table(scanner),
-                'contants_table': get_contants_table(scanner),
-                'labels_table': get_labels_table(scanner),
-            })
-        finally:
-            inp.close()
-
-        if error is None:
-            syntax_analyzer = SyntaxAnalyzer(scan_tokens)
+        if request.form.get('action') == 'run':
+            # only program output is shown, so analysis is skipped
             try:
-                syntax_tokens = syntax_analyzer.run()
+                compiled = _compile(program)
             except PKLanguageError as e:
-                error = e
-            else:
-                context['syntax_success'] = True
-
-        if error is None:
-            rpn_builder = RPNBuilder(syntax_tokens)
-            rpn_tokens = rpn_builder.build()
-            context.update({
-                'rpn_steps_table': get_rpn_table(rpn_builder),
-                'rpn_tokens': ' '.join(rpn_tokens),
-            })
-
-            if 'input' in rpn_tokens:
-                error = 'Input operator is not supported in web interface'
+                context['error'] = e
             else:
-                executor = Executor(rpn_tokens)
-                output = executor.execute()
-                context['executor_output'] = output
+                _run(context, compiled, values)
+            return render_template('index.html', **context)
 
-        context['error'] = error
+        context.update(_analyze(program))
+        if context['error'] is None:
+            _run(context, context['compiled'], values)
 
     return render_template('index.html', **context)